@@ -1,20 +1,58 @@
 from .helpers_data import (
     df_cast_data,
+    df_downcast_data,
+    set_str_backend,
     lst_df_merge_dt_freq,
     get_freq_sparse_df,
     df_merge_dt_freq,
+    get_col_info_table,
+    DtypeRegistry,
+    DTYPE_REGISTRY,
 )
 from .helpers_plot import get_ndf_plot, get_2d_df_figure, get_fig_axes
-from .helpers_sql import get_sql_connection, get_sql_tab_from_df, write_df_to_sql
+from .helpers_sql import (
+    get_sql_connection,
+    get_sql_engine,
+    get_sql_tab_from_df,
+    write_df_to_sql,
+    SqlEngineRegistry,
+    SQL_ENGINE_REGISTRY,
+    prefetch_sql_schema,
+    invalidate_sql_schema_cache,
+    SqlSchemaCache,
+    SQL_SCHEMA_CACHE,
+    read_sql_stream,
+    read_sql_parallel,
+    SqlWriterSink,
+    build_sql_tab_index,
+    get_sql_tabs_from_lst,
+    replay_sql_dead_letter,
+    SqlRetryPolicy,
+    SQL_RETRY_POLICY,
+    read_sql_cached,
+    invalidate_sql_query_cache,
+    SqlQueryCache,
+    SQL_QUERY_CACHE,
+    set_sql_max_writers,
+)
 from .helpers_logging import get_logger
-from .utils import chunk_it, run_paralle_dec, ArgParseArgument, obj_parse_n_process
+from .utils import (
+    chunk_it,
+    run_paralle_dec,
+    ArgParseArgument,
+    obj_parse_n_process,
+    SharedDataFrame,
+)
 from .helpers_stats import winsorise, adf_test_summary
 
 __all__ = [
     "df_cast_data",
+    "df_downcast_data",
+    "set_str_backend",
     "get_ndf_plot",
     "get_2d_df_figure",
     "get_sql_connection",
+    "get_sql_engine",
     "get_sql_tab_from_df",
     "write_df_to_sql",
     "chunk_it",
@@ -28,4 +66,27 @@ __all__ = [
     "obj_parse_n_process",
     "winsorise",
     "adf_test_summary",
+    "get_col_info_table",
+    "DtypeRegistry",
+    "DTYPE_REGISTRY",
+    "SqlEngineRegistry",
+    "SQL_ENGINE_REGISTRY",
+    "prefetch_sql_schema",
+    "invalidate_sql_schema_cache",
+    "SqlSchemaCache",
+    "SQL_SCHEMA_CACHE",
+    "read_sql_stream",
+    "read_sql_parallel",
+    "SqlWriterSink",
+    "build_sql_tab_index",
+    "get_sql_tabs_from_lst",
+    "replay_sql_dead_letter",
+    "SqlRetryPolicy",
+    "SQL_RETRY_POLICY",
+    "read_sql_cached",
+    "invalidate_sql_query_cache",
+    "SqlQueryCache",
+    "SQL_QUERY_CACHE",
+    "set_sql_max_writers",
+    "SharedDataFrame",
 ]
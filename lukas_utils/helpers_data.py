@@ -1,13 +1,50 @@
 import os
 import regex as re
 import toml
+import numpy as np
 import pandas as pd
 import functools as ft
+import hashlib
+import threading
+import weakref
+from collections import OrderedDict, namedtuple
 
 from .helpers_logging import get_logger
 
+try:
+    import pyarrow  # noqa: F401
+
+    IS_PYARROW = True
+except ImportError:
+    IS_PYARROW = False
+
 MY_LOGGER = get_logger(os.path.basename(__file__))
 
+# backend of str and category columns: "python" objects or "pyarrow" string[pyarrow]
+STR_BACKEND = "python"
+
+
+def _get_str_backend(str_backend: str = None) -> str:
+    if str_backend is None:
+        return STR_BACKEND
+    assert str_backend in [
+        "python",
+        "pyarrow",
+    ], f"{str_backend} must be 'python' or 'pyarrow'"
+    if (str_backend == "pyarrow") and (not IS_PYARROW):
+        raise ImportError("str_backend 'pyarrow' requires pyarrow to be installed")
+    return str_backend
+
+
+def set_str_backend(str_backend: str):
+    """
+    Sets the default backend of str and category columns for all helpers
+    :param str_backend: "python" for object / str columns, "pyarrow" for string[pyarrow] columns and categories
+    """
+    global STR_BACKEND
+    STR_BACKEND = _get_str_backend(str_backend)
+    pass
+
 
 class DataColumn:
     def __init__(
@@ -58,76 +95,270 @@ class DataColumn:
         return self.name + ": " + str(self.dtype) + ", " + str(self.freq)
 
 
-def _get_dtype_toml():
-    if "PATH_DTYPE_TOML" not in os.environ.keys():
-        MY_LOGGER.error("please add PATH_DTYPE_TOML to os.environ as abspath")
-    if "PATH_DTYPE_REGEX_TOML" not in os.environ.keys():
-        MY_LOGGER.error("please add PATH_DTYPE_REGEX_TOML to os.environ as abspath")
-    dct_dtype = toml.load(os.environ["PATH_DTYPE_TOML"])
-    dct_regex = toml.load(os.environ["PATH_DTYPE_REGEX_TOML"])
-    return dct_dtype, dct_regex
-
-
-def _get_dict_freq_dtype_update(
-    dct_dtype: dict = None, dct_regex: dict = None
-) -> (dict, dict):
-    # check dct format
-    for dct in [d for d in [dct_dtype, dct_regex] if d is not None]:
-        for k, v in dct.items():
-            if ("dtype" not in v.keys()) or (
-                len(
-                    [
-                        i
-                        for i in v.keys()
-                        if i not in ["freq", "dtype", "dtype_sql", "is_suffix"]
-                    ]
-                )
-                > 0
-            ):
-                raise TypeError(
-                    "dct_dtype should be of form {col: {'freq': 'x', 'dtype': 'x'} }"
-                )
-
-    _dct_d, _dct_r = _get_dtype_toml()
-    if dct_dtype is None:
-        dct_dtype = _dct_d
-    else:
-        dct_dtype = _dct_d | dct_dtype
+def _get_dtype_toml(path_dtype_toml: str = None, path_dtype_regex_toml: str = None):
+    if path_dtype_toml is None:
+        if "PATH_DTYPE_TOML" not in os.environ.keys():
+            MY_LOGGER.error("please add PATH_DTYPE_TOML to os.environ as abspath")
+        path_dtype_toml = os.environ["PATH_DTYPE_TOML"]
+    if path_dtype_regex_toml is None:
+        if "PATH_DTYPE_REGEX_TOML" not in os.environ.keys():
+            MY_LOGGER.error("please add PATH_DTYPE_REGEX_TOML to os.environ as abspath")
+        path_dtype_regex_toml = os.environ["PATH_DTYPE_REGEX_TOML"]
+    return path_dtype_toml, path_dtype_regex_toml
+
+
+def _check_dct_dtype_format(dct: dict):
+    for k, v in dct.items():
+        if ("dtype" not in v.keys()) or (
+            len(
+                [
+                    i
+                    for i in v.keys()
+                    if i not in ["freq", "dtype", "dtype_sql", "is_suffix"]
+                ]
+            )
+            > 0
+        ):
+            raise TypeError(
+                "dct_dtype should be of form {col: {'freq': 'x', 'dtype': 'x'} }"
+            )
 
-    if dct_regex is None:
-        dct_regex = _dct_r
-    else:
-        dct_regex = _dct_r | dct_regex
 
+def _check_dct_regex_overlap(dct_dtype: dict, dct_regex_p: dict):
     # sanity check regex patterns, if dct_dypte col matches pattern throw error
-    dct_regex_p = {re.compile(p): v for p, v in dct_regex.items()}
     for c in list(dct_dtype.keys()):
-        for p, v in dct_regex_p.items():
+        for p in dct_regex_p.keys():
             if len([*p.splititer(c)]) != 1:
                 raise KeyError(
                     f"dtype column {c} matches dtype regex pattern {p.pattern}, regex patterns cannot overlap with column names"
                 )
 
-    return dct_dtype, dct_regex
+
+def _get_dct_key(dct: dict = None):
+    # hashable key of a dct_dtype / dct_regex update, None if no update
+    if dct is None:
+        return None
+    key = tuple(sorted((k, tuple(sorted(v.items(), key=str))) for k, v in dct.items()))
+    try:
+        hash(key)
+    except TypeError:
+        key = repr(key)
+    return key
+
+
+_DtypeView = namedtuple(
+    "_DtypeView", ["dct_dtype", "dct_regex", "dct_regex_p", "p_all", "dct_col"]
+)
+
+
+def _get_regex_p_all(lst_patterns: list):
+    """
+    Combines all regex patterns into one pattern with an optional lookahead per pattern, group p{i} holds what
+    pattern i finds with search, so one match resolves all patterns of a column.
+    Returns None if patterns carry inline flags, back references or named groups, which do not survive combining.
+    """
+    if len(lst_patterns) == 0:
+        return None
+    if any(
+        re.search(r"\(\?[a-zA-Z]+\)|\\\d|\(\?P[<=]|\(\?<(?![=!])", p)
+        for p in lst_patterns
+    ):
+        return None
+    try:
+        return re.compile(
+            "".join(
+                f"(?:(?=[\\s\\S]*?(?P<p{i}>{p})))?" for i, p in enumerate(lst_patterns)
+            )
+        )
+    except re.error:
+        return None
+
+
+class DtypeRegistry:
+    """
+    Holds the dtype and dtype regex TOML specification. Both files are loaded and validated once and reloaded when
+    their modification time changes. Regex patterns are compiled once and the DataColumn of each column name is
+    memoized per dct_dtype / dct_regex update.
+    :param path_dtype_toml: abspath, defaults to os.environ["PATH_DTYPE_TOML"]
+    :param path_dtype_regex_toml: abspath, defaults to os.environ["PATH_DTYPE_REGEX_TOML"]
+    :param max_views: number of dct_dtype / dct_regex update combinations kept in memory
+    """
+
+    def __init__(
+        self,
+        path_dtype_toml: str = None,
+        path_dtype_regex_toml: str = None,
+        max_views: int = 32,
+    ):
+        self.path_dtype_toml = path_dtype_toml
+        self.path_dtype_regex_toml = path_dtype_regex_toml
+        self.max_views = max_views
+
+        self.n_hits, self.n_misses, self.n_loads = 0, 0, 0
+        self._tup_stamp = None
+        self._dct_dtype, self._dct_regex = None, None
+        self._dct_views = OrderedDict()
+        self._lock = threading.RLock()
+        pass
+
+    def __repr__(self):
+        return f"DtypeRegistry: {self.get_stats()}"
+
+    def _get_stamp(self) -> tuple:
+        path_d, path_r = _get_dtype_toml(
+            self.path_dtype_toml, self.path_dtype_regex_toml
+        )
+        return path_d, os.stat(path_d).st_mtime_ns, path_r, os.stat(path_r).st_mtime_ns
+
+    def _load(self):
+        # reload toml files only if path or modification time changed
+        tup_stamp = self._get_stamp()
+        if tup_stamp == self._tup_stamp:
+            return None
+
+        dct_dtype, dct_regex = toml.load(tup_stamp[0]), toml.load(tup_stamp[2])
+        _check_dct_dtype_format(dct_dtype)
+        _check_dct_dtype_format(dct_regex)
+
+        self._dct_dtype, self._dct_regex = dct_dtype, dct_regex
+        self._dct_views.clear()
+        self._tup_stamp = tup_stamp
+        self.n_loads += 1
+        MY_LOGGER.debug(f"loaded dtype toml: {tup_stamp[0]}, {tup_stamp[2]}")
+        pass
+
+    def get_key(self, dct_dtype: dict = None, dct_regex: dict = None) -> tuple:
+        """
+        Returns key of the column resolution: TOML files with modification time and dct_dtype / dct_regex update
+        """
+        with self._lock:
+            self._load()
+            return self._tup_stamp, _get_dct_key(dct_dtype), _get_dct_key(dct_regex)
+
+    def _get_view(self, dct_dtype: dict = None, dct_regex: dict = None) -> _DtypeView:
+        key = (_get_dct_key(dct_dtype), _get_dct_key(dct_regex))
+        with self._lock:
+            self._load()
+            if key in self._dct_views.keys():
+                self._dct_views.move_to_end(key)
+                return self._dct_views[key]
+
+            for d in [d for d in [dct_dtype, dct_regex] if d is not None]:
+                _check_dct_dtype_format(d)
+
+            dct_d = (
+                self._dct_dtype if dct_dtype is None else self._dct_dtype | dct_dtype
+            )
+            dct_r = (
+                self._dct_regex if dct_regex is None else self._dct_regex | dct_regex
+            )
+            dct_regex_p = {re.compile(p): v for p, v in dct_r.items()}
+            _check_dct_regex_overlap(dct_d, dct_regex_p)
+
+            view = _DtypeView(
+                dct_d, dct_r, dct_regex_p, _get_regex_p_all(list(dct_r.keys())), {}
+            )
+            self._dct_views[key] = view
+            while len(self._dct_views) > self.max_views:
+                self._dct_views.popitem(last=False)
+            return view
+
+    def get_dicts(self, dct_dtype: dict = None, dct_regex: dict = None) -> (dict, dict):
+        """
+        Returns dct_dtype and dct_regex updated with the TOML specification, these must not be modified
+        """
+        view = self._get_view(dct_dtype, dct_regex)
+        return view.dct_dtype, view.dct_regex
+
+    def get_col_info(
+        self, col: str, dct_dtype: dict = None, dct_regex: dict = None
+    ) -> DataColumn:
+        return self.get_lst_col_info([col], dct_dtype, dct_regex)[0]
+
+    def get_lst_col_info(
+        self, lst_cols, dct_dtype: dict = None, dct_regex: dict = None
+    ) -> list[DataColumn]:
+        view = self._get_view(dct_dtype, dct_regex)
+        dct_col = view.dct_col
+
+        # resolve each unseen column name once
+        lst_missing = [c for c in dict.fromkeys(lst_cols) if c not in dct_col.keys()]
+        for col in lst_missing:
+            dct_col[col] = _get_data_col_info(
+                col, view.dct_dtype, view.dct_regex, view.dct_regex_p, view.p_all
+            )
+
+        lst = [dct_col[col] for col in lst_cols]
+        self.n_misses += len(lst_missing)
+        self.n_hits += len(lst) - len(lst_missing)
+        return lst
+
+    def get_col_info_table(
+        self, lst_cols, dct_dtype: dict = None, dct_regex: dict = None
+    ) -> pd.DataFrame:
+        lst = self.get_lst_col_info(lst_cols, dct_dtype, dct_regex)
+        return pd.DataFrame(
+            {
+                "name": [c.name for c in lst],
+                "dtype": [c.dtype for c in lst],
+                "freq": [c.freq for c in lst],
+                "dtype_sql": [c.dtype_sql for c in lst],
+                "varchar_len": pd.array([c.varchar_len for c in lst], dtype="Int64"),
+                "is_default": [c.is_default for c in lst],
+            }
+        )
+
+    def get_stats(self) -> dict:
+        return {
+            "n_hits": self.n_hits,
+            "n_misses": self.n_misses,
+            "n_loads": self.n_loads,
+            "n_views": len(self._dct_views),
+        }
+
+    def clear(self):
+        with self._lock:
+            self._dct_views.clear()
+            self._tup_stamp = None
+            self.n_hits, self.n_misses = 0, 0
+        pass
 
 
-def _get_data_col_info(col, dct_dtypes, dct_regex) -> DataColumn:
+# default registry used by all helpers
+DTYPE_REGISTRY = DtypeRegistry()
+
+
+def _get_dict_freq_dtype_update(
+    dct_dtype: dict = None, dct_regex: dict = None
+) -> (dict, dict):
+    return DTYPE_REGISTRY.get_dicts(dct_dtype, dct_regex)
+
+
+def _get_data_col_info(
+    col, dct_dtypes, dct_regex, dct_regex_p: dict = None, p_all=None
+) -> DataColumn:
     if col in dct_dtypes.keys():
         return DataColumn(col, **dct_dtypes[col])
 
-    # compile regex patterns
-    dct_regex_p = {re.compile(p): v for p, v in dct_regex.items()}
+    # compile regex patterns, unless already compiled
+    if dct_regex_p is None:
+        dct_regex_p = {re.compile(p): v for p, v in dct_regex.items()}
+
+    # match text of each pattern, in one match if patterns are combined, see _get_regex_p_all
+    if p_all is not None:
+        match = p_all.match(col)
+        lst_match = [match.group(f"p{i}") for i in range(len(dct_regex_p))]
+    else:
+        lst_match = []
+        for p in dct_regex_p.keys():
+            match = p.search(col)
+            lst_match.append(None if match is None else match[0])
 
     # dct of regex cleaned column name, vvix_diff -> vvix, pq3_vvix -> vvix
-    dct_col_regex = {
-        # "".join(p.split(col)): v | {"regex_p": p}
-        # for p, v in dct_regex_p.items()
-        # if len(p.split(col)) > 1
-        p.search(col)[0]: v | {"regex_p": p}
-        for p, v in dct_regex_p.items()
-        if p.search(col) is not None
-    }
-    # lst = [p.split(col) for p in dct_regex_p.keys()]
+    dct_col_regex = {}
+    for (p, v), str_match in zip(dct_regex_p.items(), lst_match):
+        if str_match is not None:
+            dct_col_regex[str_match] = v | {"regex_p": p}
 
     # when several regex apply pick non-suffix with priority, if singular use this one
     # use not suffix if exaclty one non-suffix pattern applies
@@ -171,9 +402,114 @@ def _get_data_col_info(col, dct_dtypes, dct_regex) -> DataColumn:
             return DataColumn(col, **dtype_regex)
 
 
+class DfSchema:
+    """
+    Resolved DataColumns of a df and the frequency range of its columns, kept in DF_SCHEMA_CACHE.
+    :param key: DtypeRegistry.get_key of the resolution
+    :param dct_col: {column name: DataColumn}
+    :param tup_cols: columns for which tup_freq was computed
+    :param tup_freq: lowest_freq, lowest_freq_ord, highest_freq, highest_freq_ord
+    """
+
+    def __init__(
+        self, key: tuple, dct_col: dict, tup_cols: tuple = None, tup_freq=None
+    ):
+        self.key = key
+        self.dct_col = dct_col
+        self.tup_cols = tup_cols
+        self.tup_freq = tup_freq
+        pass
+
+    def __repr__(self):
+        return f"DfSchema: {len(self.dct_col)} columns, freq {self.tup_freq}"
+
+
+class DfSchemaCache:
+    """
+    DfSchema per DataFrame object, entries are held by weak reference and dropped when the df is garbage collected.
+    The df itself is never modified, so its attrs stay serializable and pickles do not depend on lukas_utils.
+    """
+
+    def __init__(self):
+        self._dct_schema = {}
+        self._lock = threading.Lock()
+        pass
+
+    def __repr__(self):
+        return f"DfSchemaCache: {self.get_stats()}"
+
+    def _pop(self, int_id: int, ref: weakref.ref):
+        with self._lock:
+            tup = self._dct_schema.get(int_id)
+            if (tup is not None) and (tup[0] is ref):
+                del self._dct_schema[int_id]
+        pass
+
+    def get(self, df: pd.DataFrame, key: tuple):
+        with self._lock:
+            tup = self._dct_schema.get(id(df))
+        if (tup is None) or (tup[0]() is not df) or (tup[1].key != key):
+            return None
+        return tup[1]
+
+    def set(self, df: pd.DataFrame, schema: DfSchema):
+        int_id = id(df)
+        ref = weakref.ref(df, lambda r: self._pop(int_id, r))
+        with self._lock:
+            self._dct_schema[int_id] = (ref, schema)
+        pass
+
+    def clear(self):
+        with self._lock:
+            self._dct_schema.clear()
+        pass
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {"n_frames": len(self._dct_schema)}
+
+
+DF_SCHEMA_CACHE = DfSchemaCache()
+
+
 def _get_df_col_info(df: pd.DataFrame, dct_dtypes, dct_regex) -> list[DataColumn]:
-    dct_dtypes, dct_regex = _get_dict_freq_dtype_update(dct_dtypes, dct_regex)
-    return [_get_data_col_info(col, dct_dtypes, dct_regex) for col in df.columns]
+    # reuse DataColumns cached for df, resolve new columns only
+    key = DTYPE_REGISTRY.get_key(dct_dtypes, dct_regex)
+    schema = DF_SCHEMA_CACHE.get(df, key)
+    dct_col = {} if schema is None else schema.dct_col
+
+    lst_missing = [c for c in dict.fromkeys(df.columns) if c not in dct_col.keys()]
+    if len(lst_missing) > 0:
+        lst = DTYPE_REGISTRY.get_lst_col_info(lst_missing, dct_dtypes, dct_regex)
+        dct_col = dct_col | dict(zip(lst_missing, lst))
+        DF_SCHEMA_CACHE.set(df, DfSchema(key, dct_col))
+    return [dct_col[c] for c in df.columns]
+
+
+def _set_df_schema_union(df: pd.DataFrame, lst_df: list, dct_dtypes, dct_regex):
+    # cache DataColumns of all source dfs for a df built from them
+    key = DTYPE_REGISTRY.get_key(dct_dtypes, dct_regex)
+    dct_col = {}
+    for d in lst_df:
+        schema = DF_SCHEMA_CACHE.get(d, key)
+        if schema is not None:
+            dct_col = dct_col | schema.dct_col
+    if len(dct_col) > 0:
+        DF_SCHEMA_CACHE.set(df, DfSchema(key, dct_col))
+    pass
+
+
+def get_col_info_table(
+    lst_cols, dct_dtype: dict = None, dct_regex: dict = None
+) -> pd.DataFrame:
+    """
+    Classifies all columns in one pass
+    :param lst_cols: column names, e.g. df.columns
+    :param dct_dtype:
+    :param dct_regex:
+    :return: pd.DataFrame with columns name, dtype, freq, dtype_sql, varchar_len, is_default
+    """
+    return DTYPE_REGISTRY.get_col_info_table(lst_cols, dct_dtype, dct_regex)
 
 
 def lst_df_sort_by_freq(
@@ -192,11 +528,9 @@ def lst_df_sort_by_freq(
     return lst
 
 
-def _get_lowest_freq(df, dct_dtype, dct_regex):
-    # dct_dtype, dct_regex = _get_dict_freq_dtype_update(dct_dtype, dct_regex)
-    lst_cols = _get_df_col_info(df, dct_dtype, dct_regex)
+def _get_lst_col_freq(lst_col_info: list[DataColumn]):
     dct_dtypes_col = {}
-    for dtype in lst_cols:
+    for dtype in lst_col_info:
         if dtype.is_default:
             MY_LOGGER.warning(f"{dtype.name} not in dct_dypte: using freq D")
 
@@ -211,6 +545,142 @@ def _get_lowest_freq(df, dct_dtype, dct_regex):
     return lowest_freq, lowest_freq_ord, highest_freq, highest_freq_ord
 
 
+def _get_lowest_freq(df, dct_dtype, dct_regex):
+    # reuse frequency range cached for df if columns are unchanged
+    key = DTYPE_REGISTRY.get_key(dct_dtype, dct_regex)
+    tup_cols = tuple(df.columns)
+    schema = DF_SCHEMA_CACHE.get(df, key)
+    if (schema is not None) and (schema.tup_cols == tup_cols):
+        return schema.tup_freq
+
+    tup_freq = _get_lst_col_freq(_get_df_col_info(df, dct_dtype, dct_regex))
+    schema = DF_SCHEMA_CACHE.get(df, key)
+    DF_SCHEMA_CACHE.set(df, DfSchema(key, schema.dct_col, tup_cols, tup_freq))
+    return tup_freq
+
+
+PeriodKey = namedtuple(
+    "PeriodKey",
+    ["codes", "periods", "timestamps", "periods_unique", "timestamps_unique"],
+)
+
+
+def _get_period_key(idx: pd.DatetimeIndex, freq: str) -> PeriodKey:
+    periods = idx.to_period(freq)
+    codes, periods_unique = pd.factorize(periods, sort=True)
+    codes.flags.writeable = False
+    periods_unique = pd.PeriodIndex(periods_unique, name=idx.name)
+    return PeriodKey(
+        codes,
+        periods,
+        periods.to_timestamp(),
+        periods_unique,
+        periods_unique.to_timestamp(),
+    )
+
+
+class PeriodKeyCache:
+    """
+    LRU cache of period keys of a DatetimeIndex per frequency. Indices are identified by a fingerprint of their
+    values, so equal indices share a cache entry.
+    PeriodKey.codes: int group code per row, -1 for NaT, codes are ordered like periods_unique
+    PeriodKey.periods, PeriodKey.timestamps: idx.to_period(freq) and idx.to_period(freq).to_timestamp() per row
+    PeriodKey.periods_unique, PeriodKey.timestamps_unique: sorted unique periods and their start timestamps
+    :param max_size: number of index, frequency combinations kept in memory
+    """
+
+    def __init__(self, max_size: int = 64):
+        self.max_size = max_size
+        self.n_hits, self.n_misses = 0, 0
+        self._dct_keys = OrderedDict()
+        self._lock = threading.Lock()
+        pass
+
+    def __repr__(self):
+        return f"PeriodKeyCache: {self.get_stats()}"
+
+    @staticmethod
+    def _get_fingerprint(idx: pd.DatetimeIndex, freq: str) -> tuple:
+        arr = np.ascontiguousarray(idx.asi8)
+        digest = hashlib.blake2b(memoryview(arr), digest_size=16).digest()
+        name = idx.name
+        try:
+            hash(name)
+        except TypeError:
+            name = repr(name)
+        return freq, str(idx.dtype), name, len(idx), digest
+
+    def get(self, idx: pd.DatetimeIndex, freq: str) -> PeriodKey:
+        key = self._get_fingerprint(idx, freq)
+        with self._lock:
+            if key in self._dct_keys.keys():
+                self._dct_keys.move_to_end(key)
+                self.n_hits += 1
+                return self._dct_keys[key]
+
+        period_key = _get_period_key(idx, freq)
+        with self._lock:
+            self.n_misses += 1
+            self._dct_keys[key] = period_key
+            while len(self._dct_keys) > self.max_size:
+                self._dct_keys.popitem(last=False)
+        return period_key
+
+    def get_stats(self) -> dict:
+        return {
+            "n_hits": self.n_hits,
+            "n_misses": self.n_misses,
+            "n_keys": len(self._dct_keys),
+        }
+
+    def clear(self):
+        with self._lock:
+            self._dct_keys.clear()
+            self.n_hits, self.n_misses = 0, 0
+        pass
+
+
+# default period key cache used by all frequency helpers
+PERIOD_KEY_CACHE = PeriodKeyCache()
+
+
+def _df_agg_period(
+    df: pd.DataFrame,
+    freq: str,
+    agg_obs: str = "first",
+    return_timestamp_index: bool = True,
+    period_key: PeriodKey = None,
+) -> pd.DataFrame:
+    # aggregate df per period of freq, grouping on integer codes, cached unless period_key is passed
+    if period_key is None:
+        period_key = PERIOD_KEY_CACHE.get(df.index, freq)
+    codes = period_key.codes
+    if (codes < 0).any():
+        # NaT is not grouped
+        df, codes = df.iloc[codes >= 0], codes[codes >= 0]
+
+    if agg_obs == "first":
+        d = df.groupby(codes).first()
+    elif agg_obs == "last":
+        d = df.groupby(codes).last()
+    elif agg_obs == "mean":
+        d = df.groupby(codes).mean()
+    elif agg_obs == "median":
+        d = df.groupby(codes).quantile(0.5)
+    elif agg_obs == "sum":
+        d = df.groupby(codes).sum()
+    elif agg_obs == "count":
+        d = df.groupby(codes).count()
+    else:
+        raise KeyError(f"{agg_obs} is an invalde aggegration method")
+
+    if return_timestamp_index:
+        d.index = period_key.timestamps_unique.take(d.index.to_numpy())
+    else:
+        d.index = period_key.periods_unique.take(d.index.to_numpy())
+    return d
+
+
 def get_freq_adj_df(
     df: pd.DataFrame | pd.Series,
     dct_dtype: dict = None,
@@ -225,64 +695,136 @@ def get_freq_adj_df(
         df = pd.Series(df).to_frame()
 
     lowest_freq, _, _, _ = _get_lowest_freq(df, dct_dtype, dct_regex)
+    d = _df_agg_period(df, lowest_freq, agg_obs, return_timestamp_index)
+
+    if is_ser:
+        d = d[d.columns[0]]
+    return d
+
 
+def _get_dct_agg_period_part(df: pd.DataFrame, freq: str, agg_obs: str) -> dict:
+    # mergeable per period aggregates of a chunk, indexed by period. Chunk keys are not reused, so they are not cached
+    period_key = _get_period_key(df.index, freq)
+    agg = ft.partial(
+        _df_agg_period, return_timestamp_index=False, period_key=period_key
+    )
+    if agg_obs in ["first", "last"]:
+        return {"v": agg(df, freq, agg_obs)}
+    elif agg_obs == "mean":
+        return {"sum": agg(df, freq, "sum"), "n": agg(df, freq, "count")}
+    else:
+        return {"v": agg(df, freq, "median"), "n": agg(df, freq, "count")}
+
+
+def _get_dct_agg_period_combined(dct_l: dict, dct_r: dict, agg_obs: str) -> dict:
+    # combine aggregates of the same period from consecutive chunks
     if agg_obs == "first":
-        d = df.groupby(df.index.to_period(lowest_freq)).first()
+        return {"v": dct_l["v"].combine_first(dct_r["v"])}
     elif agg_obs == "last":
-        d = df.groupby(df.index.to_period(lowest_freq)).last()
+        return {"v": dct_r["v"].combine_first(dct_l["v"])}
     elif agg_obs == "mean":
-        d = df.groupby(df.index.to_period(lowest_freq)).mean()
-    elif agg_obs == "median":
-        d = df.groupby(df.index.to_period(lowest_freq)).quantile(0.5)
+        return {
+            "sum": dct_l["sum"].add(dct_r["sum"], fill_value=0),
+            "n": dct_l["n"].add(dct_r["n"], fill_value=0),
+        }
     else:
-        raise KeyError(f"{agg_obs} is an invalde aggegration method")
+        n = dct_l["n"].add(dct_r["n"], fill_value=0)
+        v = (
+            dct_l["v"].mul(dct_l["n"]).add(dct_r["v"].mul(dct_r["n"]), fill_value=0)
+        ).div(n)
+        return {"v": v, "n": n}
 
-    if return_timestamp_index:
-        d.index = d.index.to_timestamp()
 
-    if is_ser:
-        d = d[d.columns[0]]
-    return d
+def _get_df_agg_period_final(dct: dict, agg_obs: str) -> pd.DataFrame:
+    if agg_obs == "mean":
+        return dct["sum"].div(dct["n"].where(dct["n"] > 0))
+    return dct["v"]
 
 
-def df_merge_dt_freq(
-    df_left,
-    df_right,
+def iter_freq_adj_df(
+    iter_df,
     dct_dtype: dict = None,
     dct_regex: dict = None,
-    str_merge_how: str = "outer",
+    agg_obs: str = "first",
+    return_timestamp_index: bool = True,
+    is_median_approx: bool = False,
+    freq: str = None,
 ):
     """
-    This function merges two dt indexed dataframes. If the frequencies agree the it performs a simple left or outer
-    merge (for right merge swap dfs!).
-    If the frequencies do not align this functions takes the left df's frequency as baseline. It then merges the right
-    df according to the left frequency creating a frequency adjusted key.
-    :param df_l:
-    :param df_r:
+    Streaming version of get_freq_adj_df for time sorted chunks, e.g. from pd.read_sql(chunksize=n) or parquet row
+    groups. The last period of each chunk is held back as partial aggregate and combined with the next chunk, so
+    memory is bounded by one chunk. Period keys of chunks are not stored in PERIOD_KEY_CACHE.
+    first, last and mean are exact. median requires is_median_approx=True: periods within one chunk are exact,
+    periods split across chunks are the count weighted mean of the per chunk medians.
+    :param iter_df: iterable of pd.DataFrame or pd.Series with datetime index, sorted across chunks
     :param dct_dtype:
     :param dct_regex:
-    :param str_merge_how:
-    :return:
+    :param agg_obs: 'first', 'last', 'mean' or 'median'
+    :param return_timestamp_index:
+    :param is_median_approx: allow approximate median
+    :param freq: aggregation frequency, defaults to the lowest frequency of the first chunk's columns
+    :return: generator of aggregated chunks
     """
+    if agg_obs not in ["first", "last", "mean", "median"]:
+        raise KeyError(f"{agg_obs} is an invalde aggegration method")
+    if (agg_obs == "median") and (not is_median_approx):
+        raise KeyError(
+            "median cannot be streamed exactly, set is_median_approx=True for approximate median"
+        )
+
+    def _get_out(dct: dict):
+        d = _get_df_agg_period_final(dct, agg_obs)
+        if return_timestamp_index:
+            d.index = d.index.to_timestamp()
+        if is_ser:
+            d = d[d.columns[0]]
+        return d
+
+    is_ser, dct_carry = False, None
+    for df in iter_df:
+        assert df.index.dtype == "datetime64[ns]", "df does not have datetime index"
+        if isinstance(df, pd.Series):
+            is_ser = True
+            df = df.to_frame()
+        if df.empty:
+            continue
+
+        if freq is None:
+            freq, _, _, _ = _get_lowest_freq(df, dct_dtype, dct_regex)
+
+        dct = _get_dct_agg_period_part(df, freq, agg_obs)
+        idx = next(iter(dct.values())).index
+        if len(idx) == 0:
+            continue
+
+        if dct_carry is not None:
+            period_carry = next(iter(dct_carry.values())).index[0]
+            assert (
+                idx[0] >= period_carry
+            ), f"chunks are not time sorted: {idx[0]} before {period_carry}"
+            if idx[0] == period_carry:
+                dct_first = _get_dct_agg_period_combined(
+                    dct_carry, {k: v.iloc[:1] for k, v in dct.items()}, agg_obs
+                )
+                dct = {k: pd.concat([dct_first[k], v.iloc[1:]]) for k, v in dct.items()}
+            else:
+                yield _get_out(dct_carry)
 
-    df_l = df_left.copy()
-    df_r = df_right.copy()
-    assert df_l.index.dtype == "datetime64[ns]", "df does not have datetime index"
-    assert df_r.index.dtype == "datetime64[ns]", "df does not have datetime index"
-    assert str_merge_how in [
-        "outer",
-        "left",
-    ], f"function not defined for str_merge_how={str_merge_how}, for 'right' swap dfs!"
+        # hold back last, possibly incomplete, period
+        dct_carry = {k: v.iloc[-1:] for k, v in dct.items()}
+        if len(idx) > 1:
+            yield _get_out({k: v.iloc[:-1] for k, v in dct.items()})
 
-    lf_left, lf_left_ord, hf_left, hf_left_ord = _get_lowest_freq(
-        df_l, dct_dtype, dct_regex
-    )
-    lf_right, lf_right_ord, hf_right, hf_right_ord = _get_lowest_freq(
-        df_r, dct_dtype, dct_regex
-    )
+    if dct_carry is not None:
+        yield _get_out(dct_carry)
 
+
+def _df_merge_dt_freq_key(
+    df_l, df_r, hf_left, hf_left_ord, hf_right, hf_right_ord, str_merge_how
+):
+    # merges on frequency adjusted key, df_l and df_r are modified
     if hf_left_ord > hf_right_ord:
-        df_l["key"] = df_l.index.to_period(hf_right).to_timestamp()
+        df_l["key"] = PERIOD_KEY_CACHE.get(df_l.index, hf_right).timestamps
 
         if str_merge_how == "outer":
             df = pd.merge(df_l, df_r, left_on="key", right_index=True, how="outer")
@@ -301,13 +843,13 @@ def df_merge_dt_freq(
             )
 
     elif hf_left_ord == hf_right_ord:
-        df_l.index = df_l.index.to_period(hf_left)
-        df_r.index = df_r.index.to_period(hf_right)
+        df_l.index = PERIOD_KEY_CACHE.get(df_l.index, hf_left).periods
+        df_r.index = PERIOD_KEY_CACHE.get(df_r.index, hf_right).periods
         df = df_l.join(df_r, how=str_merge_how)
         df.index = df.index.to_timestamp()
 
     else:
-        df_r["key"] = df_r.index.to_period(hf_left).to_timestamp()
+        df_r["key"] = PERIOD_KEY_CACHE.get(df_r.index, hf_left).timestamps
         df_r = df_r.sort_index().groupby("key").last()
         df = df_l.join(df_r, how=str_merge_how)
 
@@ -316,68 +858,423 @@ def df_merge_dt_freq(
             df = df.drop(col, axis=1)
 
     df.index.name = "calendardate"
+    return df
+
+
+def df_merge_dt_freq(
+    df_left,
+    df_right,
+    dct_dtype: dict = None,
+    dct_regex: dict = None,
+    str_merge_how: str = "outer",
+    is_downcast: bool = False,
+    str_backend: str = None,
+):
+    """
+    This function merges two dt indexed dataframes. If the frequencies agree the it performs a simple left or outer
+    merge (for right merge swap dfs!).
+    If the frequencies do not align this functions takes the left df's frequency as baseline. It then merges the right
+    df according to the left frequency creating a frequency adjusted key.
+    :param df_l:
+    :param df_r:
+    :param dct_dtype:
+    :param dct_regex:
+    :param str_merge_how:
+    :param is_downcast: downcast merged df, see df_downcast_data
+    :param str_backend: "python" or "pyarrow", see set_str_backend
+    :return:
+    """
+
+    df_l = df_left.copy()
+    df_r = df_right.copy()
+    assert df_l.index.dtype == "datetime64[ns]", "df does not have datetime index"
+    assert df_r.index.dtype == "datetime64[ns]", "df does not have datetime index"
+    assert str_merge_how in [
+        "outer",
+        "left",
+    ], f"function not defined for str_merge_how={str_merge_how}, for 'right' swap dfs!"
+
+    lf_left, lf_left_ord, hf_left, hf_left_ord = _get_lowest_freq(
+        df_l, dct_dtype, dct_regex
+    )
+    lf_right, lf_right_ord, hf_right, hf_right_ord = _get_lowest_freq(
+        df_r, dct_dtype, dct_regex
+    )
+
+    df = _df_merge_dt_freq_key(
+        df_l, df_r, hf_left, hf_left_ord, hf_right, hf_right_ord, str_merge_how
+    )
     df = df_cast_data(
-        df.reset_index(), dct_dtype=dct_dtype, dct_regex=dct_regex
+        df.reset_index(),
+        dct_dtype=dct_dtype,
+        dct_regex=dct_regex,
+        is_downcast=is_downcast,
+        str_backend=str_backend,
     ).set_index("calendardate")
     return df
 
 
+def _get_arr_row(ser: pd.Series) -> np.ndarray:
+    # row positions from merge result, -1 where row is missing
+    return ser.fillna(-1).to_numpy().astype(np.int64)
+
+
 def lst_df_merge_dt_freq(
-    lst_df, how: str = "outer", dct_dtype: dict = None, dct_regex: dict = None
+    lst_df,
+    how: str = "outer",
+    dct_dtype: dict = None,
+    dct_regex: dict = None,
+    is_downcast: bool = False,
+    str_backend: str = None,
 ):
-    df = ft.reduce(
-        lambda left, right: df_merge_dt_freq(
-            left, right, str_merge_how=how, dct_dtype=dct_dtype, dct_regex=dct_regex
-        ),
-        lst_df_sort_by_freq(lst_df, dct_dtype=dct_dtype, dct_regex=dct_regex),
+    """
+    Merges a list of dt indexed dataframes, sorted from highest to lowest frequency, with the semantics of repeated
+    df_merge_dt_freq calls. Frequencies are classified once per df and the pairwise merges only run on row positions,
+    the data is aligned in a single concatenation and cast once.
+    :param lst_df:
+    :param how: 'outer' or 'left'
+    :param dct_dtype:
+    :param dct_regex:
+    :param is_downcast: downcast merged df, see df_downcast_data
+    :param str_backend: "python" or "pyarrow", see set_str_backend
+    :return:
+    """
+    assert how in [
+        "outer",
+        "left",
+    ], f"function not defined for how={how}, for 'right' swap dfs!"
+    for df in lst_df:
+        assert df.index.dtype == "datetime64[ns]", "df does not have datetime index"
+
+    # classify frequencies once, sort by highest frequency
+    lst_tup = [(df, _get_lowest_freq(df, dct_dtype, dct_regex)) for df in lst_df]
+    lst_tup = sorted(lst_tup, key=lambda x: x[1][3], reverse=True)
+    lst_df = [tup[0] for tup in lst_tup]
+    if len(lst_df) == 1:
+        return lst_df[0]
+
+    # overlapping columns are suffixed or rejected by pairwise merges, keep these semantics
+    lst_cols = [c for df in lst_df for c in df.columns]
+    if (len(set(lst_cols)) != len(lst_cols)) or any(
+        c in ["index", "key"] for c in lst_cols
+    ):
+        MY_LOGGER.debug("overlapping column names, merging pairwise")
+        return ft.reduce(
+            lambda left, right: df_merge_dt_freq(
+                left,
+                right,
+                str_merge_how=how,
+                dct_dtype=dct_dtype,
+                dct_regex=dct_regex,
+                is_downcast=is_downcast,
+                str_backend=str_backend,
+            ),
+            lst_df,
+        )
+
+    # merge row positions, columns other than positions only occur from named left index in outer merges
+    _, _, hf, hf_ord = lst_tup[0][1]
+    df_pos = pd.DataFrame(index=lst_df[0].index)
+    lst_tup_row = []
+    for i in range(1, len(lst_df)):
+        df_r = lst_df[i]
+        _, _, hf_right, hf_right_ord = lst_tup[i][1]
+
+        # aggregate higher frequency right df once on the real data
+        if hf_right_ord > hf_ord:
+            df_r = df_r.copy()
+            df_r["key"] = PERIOD_KEY_CACHE.get(df_r.index, hf).timestamps
+            df_r = df_r.sort_index().groupby("key").last()
+            lst_df[i] = df_r
+
+        df_pos["_row_l"] = np.arange(len(df_pos))
+        df_pos = _df_merge_dt_freq_key(
+            df_pos,
+            pd.DataFrame({"_row_r": np.arange(len(df_r))}, index=df_r.index),
+            hf,
+            hf_ord,
+            hf_right,
+            hf_right_ord,
+            how,
+        )
+        lst_tup_row.append(
+            (_get_arr_row(df_pos.pop("_row_l")), _get_arr_row(df_pos.pop("_row_r")))
+        )
+
+        # highest frequency of merged columns
+        lst_freq = [(hf, hf_ord), (hf_right, hf_right_ord)]
+        if len(df_pos.columns) > 0:
+            lst_freq.append(_get_lowest_freq(df_pos, dct_dtype, dct_regex)[2:])
+        hf, hf_ord = max(lst_freq, key=lambda x: x[1])
+
+    # resolve row positions of each df in the merged index
+    arr_row = np.arange(len(df_pos))
+    lst_arr_row = [None] * len(lst_df)
+    for i in range(len(lst_df) - 1, 0, -1):
+        arr_l, arr_r = lst_tup_row[i - 1]
+        is_row = arr_row >= 0
+        lst_arr_row[i] = np.where(is_row, arr_r[np.maximum(arr_row, 0)], -1)
+        arr_row = np.where(is_row, arr_l[np.maximum(arr_row, 0)], -1)
+    lst_arr_row[0] = arr_row
+
+    df = pd.concat(
+        [df_pos]
+        + [
+            d.reset_index(drop=True).reindex(arr).set_axis(df_pos.index, axis=0)
+            for d, arr in zip(lst_df, lst_arr_row)
+        ],
+        axis=1,
     )
-    return df
+    df.index.name = "calendardate"
+    _set_df_schema_union(df, lst_df, dct_dtype, dct_regex)
+    return df_cast_data(
+        df,
+        dct_dtype=dct_dtype,
+        dct_regex=dct_regex,
+        is_cast_index=True,
+        inplace=True,
+        is_downcast=is_downcast,
+        str_backend=str_backend,
+    )
+
+
+def _get_df_cast_plan(
+    df: pd.DataFrame, lst_col_info: list[DataColumn], str_backend: str = "python"
+) -> dict:
+    """
+    Groups columns by target dtype, numeric, bool, datetime and Arrow string columns which already have their target
+    dtype are skipped
+    :return: {dtype: [DataColumn]}
+    """
+    dct_plan = {}
+    for dtype in lst_col_info:
+        str_dtype = dtype.dtype
+        if (str_dtype == "str") and (str_backend == "pyarrow"):
+            str_dtype = "string[pyarrow]"
+
+        if str_dtype not in ["str", "category", "categoryO"]:
+            try:
+                if df[dtype.name].dtype == pd.api.types.pandas_dtype(str_dtype):
+                    continue
+            except TypeError:
+                pass
+        dct_plan.setdefault(str_dtype, []).append(dtype)
+    return dct_plan
+
+
+def _df_cast_cols(
+    df: pd.DataFrame, str_dtype: str, lst_cols: list, str_backend: str = "python"
+):
+    # categories are python objects or Arrow strings
+    str_dtype_cat = object if str_backend == "python" else "string[pyarrow]"
+    if str_dtype == "category":
+        df[lst_cols] = df[lst_cols].astype(str_dtype_cat).astype("category")
+    elif str_dtype == "categoryO":
+        for col in lst_cols:
+            df[col] = pd.Categorical(df[col].astype(str_dtype_cat), ordered=True)
+    else:
+        df[lst_cols] = df[lst_cols].astype(str_dtype)
+    pass
+
+
+def _get_ser_str_len_max(ser: pd.Series):
+    # vectorised string length, falls back to str conversion for non string values
+    try:
+        return ser.str.len().max()
+    except AttributeError:
+        return ser.astype(str).str.len().max()
+
+
+def _get_int_dtype_min(int_min, int_max, is_nullable: bool):
+    for str_dtype in ["int8", "int16", "int32", "int64"]:
+        info = np.iinfo(str_dtype)
+        if (info.min <= int_min) and (int_max <= info.max):
+            return str_dtype.capitalize() if is_nullable else str_dtype
+    return None
+
+
+def _get_ser_downcast(ser: pd.Series, dtype: DataColumn, cat_max_ratio: float):
+    # narrowest dtype which represents all values of ser exactly, None if ser is kept
+    if dtype.dtype == "int":
+        arr = ser.to_numpy(dtype=float, na_value=np.nan)
+        is_na = np.isnan(arr)
+        if is_na.all() or (np.mod(arr[~is_na], 1) != 0).any():
+            return None
+        return _get_int_dtype_min(
+            arr[~is_na].min(), arr[~is_na].max(), bool(is_na.any())
+        )
+
+    elif (dtype.dtype == "float") and (ser.dtype == np.float64):
+        arr = ser.to_numpy()
+        with np.errstate(over="ignore"):
+            if np.array_equal(
+                arr.astype(np.float32).astype(np.float64), arr, equal_nan=True
+            ):
+                return "float32"
+        return None
+
+    elif dtype.dtype == "str":
+        if len(ser) == 0:
+            return None
+        if ser.nunique(dropna=True) / len(ser) <= cat_max_ratio:
+            return "category"
+        return "string[pyarrow]" if IS_PYARROW else "string"
+
+    return None
+
+
+def _df_downcast(
+    df: pd.DataFrame,
+    lst_col_info: list[DataColumn],
+    cat_max_ratio: float = 0.5,
+) -> pd.DataFrame:
+    # downcasts df in place, returns memory report
+    ser_mem_before = df.memory_usage(deep=True, index=False)
+    dct_dtype_before = {c: str(t) for c, t in df.dtypes.items()}
+
+    for dtype in lst_col_info:
+        try:
+            str_dtype = _get_ser_downcast(df[dtype.name], dtype, cat_max_ratio)
+            if str_dtype is not None:
+                df[dtype.name] = df[dtype.name].astype(str_dtype)
+        except Exception as e:
+            MY_LOGGER.error(
+                f"ERROR downcasting {dtype.name} of type {dtype.dtype}: {e}"
+            )
+
+    df_mem = pd.DataFrame(
+        {
+            "dtype_before": pd.Series(dct_dtype_before),
+            "dtype_after": df.dtypes.astype(str),
+            "bytes_before": ser_mem_before,
+            "bytes_after": df.memory_usage(deep=True, index=False),
+        }
+    )
+    MY_LOGGER.debug(
+        f"downcast: {df_mem['bytes_before'].sum() / 1e6:.1f}MB -> {df_mem['bytes_after'].sum() / 1e6:.1f}MB"
+    )
+    return df_mem
+
+
+def df_downcast_data(
+    df,
+    dct_dtype: dict = None,
+    dct_regex: dict = None,
+    cat_max_ratio: float = 0.5,
+    inplace: bool = False,
+) -> (pd.DataFrame, pd.DataFrame):
+    """
+    Downcasts columns to the narrowest dtype which holds their values exactly, given their DataColumn dtype: int ->
+    smallest (nullable) int, float -> float32 if lossless, str -> category if the share of unique values is at most
+    cat_max_ratio, else nullable string (Arrow backed if pyarrow is installed). Other dtypes are kept.
+    :param df: pd.DataFrame, ideally cast by df_cast_data
+    :param dct_dtype:
+    :param dct_regex:
+    :param cat_max_ratio: maximum share of unique values for categorical varchar columns
+    :param inplace:
+    :return: df, df_mem memory report per column with dtype_before, dtype_after, bytes_before, bytes_after
+    """
+    if not inplace:
+        df = df.copy(deep=False)
+    df_mem = _df_downcast(
+        df, _get_df_col_info(df, dct_dtype, dct_regex), cat_max_ratio=cat_max_ratio
+    )
+    return df, df_mem
 
 
 def df_cast_data(
-    df, dct_dtype: dict = None, dct_regex: dict = None, is_cast_index: bool = False
+    df,
+    dct_dtype: dict = None,
+    dct_regex: dict = None,
+    is_cast_index: bool = False,
+    inplace: bool = False,
+    is_downcast: bool = False,
+    str_backend: str = None,
 ) -> pd.DataFrame:
-    df = df.copy()
+    """
+    Casts columns to their DataColumn dtype. Columns are grouped by target dtype and each group is cast with one
+    astype call.
+    :param df:
+    :param dct_dtype:
+    :param dct_regex:
+    :param is_cast_index: cast named index as well
+    :param inplace: cast columns of df without copying the frame, df is returned as well
+    :param is_downcast: downcast to the narrowest exact dtype after casting, see df_downcast_data
+    :param str_backend: "python" or "pyarrow", defaults to STR_BACKEND, see set_str_backend
+    :return:
+    """
+    str_backend = _get_str_backend(str_backend)
+
+    # shallow copy, resetting the index must not alter the input
+    if not inplace:
+        df = df.copy(deep=False)
 
     is_index_dropped, col_idx_name = False, None
     if is_cast_index:
         if (df.index.name != "") and (df.index.name is not None):
             is_index_dropped = True
             col_idx_name = df.index.name
-            df = df.reset_index(drop=False)
+            df.reset_index(drop=False, inplace=True)
         else:
             MY_LOGGER.warning("Index has no name and cannot be casted")
 
-    for dtype in _get_df_col_info(df, dct_dtype, dct_regex):
+    lst_col_info = _get_df_col_info(df, dct_dtype, dct_regex)
+    dct_plan = _get_df_cast_plan(df, lst_col_info, str_backend)
+
+    # copy: a single astype call copies the frame once while casting, categories are cast afterwards
+    if not inplace:
+        dct_astype = {
+            dtype.name: str_dtype
+            for str_dtype, lst_dtype in dct_plan.items()
+            for dtype in lst_dtype
+            if str_dtype not in ["category", "categoryO"]
+        }
         try:
-            if dtype.dtype == "category":
-                df[dtype.name] = df[dtype.name].astype(object).astype("category")
-            elif dtype.dtype == "categoryO":
-                df[dtype.name] = pd.Categorical(
-                    df[dtype.name].astype(object), ordered=True
-                )
-            elif dtype.is_varchar:
-                if (not df.empty) and (
-                    not df[dtype.name].astype(str).apply(lambda x: len(str(x))).max()
-                    <= dtype.varchar_len
-                ):
+            df = df.astype(dct_astype)
+            dct_plan = {
+                k: v for k, v in dct_plan.items() if k in ["category", "categoryO"]
+            }
+        except Exception:
+            df = df.copy()
+
+    for str_dtype, lst_dtype in dct_plan.items():
+        lst_cols = [dtype.name for dtype in lst_dtype]
+        try:
+            _df_cast_cols(df, str_dtype, lst_cols, str_backend)
+        except Exception:
+            # cast column by column to find the failing ones
+            for col in lst_cols:
+                try:
+                    _df_cast_cols(df, str_dtype, [col], str_backend)
+                except Exception as e:
+                    MY_LOGGER.error(f"ERROR for {col} of type {str_dtype}: {e}")
+
+    if not df.empty:
+        for dtype in [d for d in lst_col_info if d.is_varchar]:
+            try:
+                # NaN for columns without strings, which never exceed the length
+                if _get_ser_str_len_max(df[dtype.name]) > dtype.varchar_len:
                     MY_LOGGER.warning(
                         f"{dtype.name} exceeds SQL varchar length {dtype.varchar_len}"
                     )
-                df[dtype.name] = df[dtype.name].astype(dtype.dtype)
-            else:
-                df[dtype.name] = df[dtype.name].astype(dtype.dtype)
+            except Exception as e:
+                MY_LOGGER.error(f"ERROR for {dtype.name} of type {dtype.dtype}: {e}")
 
-        except Exception as e:
-            MY_LOGGER.error(f"ERROR for {dtype.name} of type {dtype.dtype}: {e}")
+    if is_downcast:
+        df_mem = _df_downcast(df, lst_col_info)
+        MY_LOGGER.debug(f"downcast memory per column:\n{df_mem}")
 
     if is_index_dropped:
-        df = df.set_index(col_idx_name)
+        df.set_index(col_idx_name, inplace=True)
     return df
 
 
 def get_freq_sparse_df(
-    df, sparse_kind: str = "first", dct_dtype: dict = None, dct_regex: dict = None
+    df,
+    sparse_kind: str = "first",
+    dct_dtype: dict = None,
+    dct_regex: dict = None,
+    str_backend: str = None,
 ) -> pd.DataFrame:
     assert isinstance(df.index, pd.DatetimeIndex), "no datetime index present"
     assert sparse_kind in [
@@ -386,22 +1283,44 @@ def get_freq_sparse_df(
     ], 'sparse_king must be either "first" or "last"'
 
     # assign lowest frequency
-    lf, lf_ord, hf, hf_ord = _get_lowest_freq(df, dct_dtype, dct_regex)
+    lst_col_info = _get_df_col_info(df, dct_dtype, dct_regex)
+    lf, lf_ord, hf, hf_ord = _get_lst_col_freq(lst_col_info)
+
+    # group Arrow strings instead of python str objects or str columns with NaN missing values
+    if _get_str_backend(str_backend) == "pyarrow":
+        dtype_arrow = pd.api.types.pandas_dtype("string[pyarrow]")
+        lst = [
+            d.name
+            for d in lst_col_info
+            if (d.dtype == "str")
+            and (df[d.name].dtype != dtype_arrow)
+            and (
+                (df[d.name].dtype == object)
+                or isinstance(df[d.name].dtype, pd.StringDtype)
+            )
+        ]
+        if len(lst) > 0:
+            df = df.copy(deep=False)
+            _df_cast_cols(df, "string[pyarrow]", lst, "pyarrow")
+
     df = df.asfreq(hf).sort_index()
 
-    # make cols with freq > lf sparse
-    for dtype in _get_df_col_info(df, dct_dtype, dct_regex):
-        ser = df.groupby(df.index.to_period(dtype.freq).to_timestamp())[
-            dtype.name
-        ].first()
-        if sparse_kind == "last":
-            ser = df.groupby(df.index.to_period(dtype.freq).to_timestamp())[
-                dtype.name
-            ].last()
-
-        df = df.drop(
-            dtype.name,
-            axis=1,
-        ).join(ser, how="outer")
+    # bucket columns by frequency
+    dct_freq_cols = {}
+    for dtype in lst_col_info:
+        dct_freq_cols.setdefault(dtype.freq, []).append(dtype.name)
+
+    # make cols with freq > lf sparse, one groupby per frequency
+    lst_df = []
+    for freq, lst_cols in dct_freq_cols.items():
+        lst_df.append(_df_agg_period(df[lst_cols], freq, sparse_kind))
+
+    idx = df.index
+    for d in lst_df:
+        idx = idx.union(d.index)
 
+    lst_cols = list(df.columns)
+    df = pd.concat([d.reindex(idx) for d in lst_df], axis=1)
+    if list(df.columns) != lst_cols:
+        df = df[lst_cols]
     return df.dropna(thresh=1)
@@ -1,17 +1,23 @@
 import argparse
+import atexit
 import functools
 import multiprocessing
+from multiprocessing import resource_tracker, shared_memory
 from collections import namedtuple
 import time
 import numpy as np
+import pandas as pd
 from tqdm import tqdm
 import os
 from .helpers_logging import get_logger
 from joblib import Parallel, delayed
+from joblib.externals.loky import get_reusable_executor
 
 
 from atpbar import flush, atpbar
 import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 
 
 MY_LOGGER = get_logger(os.path.basename(__file__))
@@ -80,6 +86,106 @@ def time_it(func):
     return wrapper
 
 
+def _get_pool_future(pool, func, arg) -> Future:
+    # multiprocessing.Pool task as concurrent.futures.Future
+    fut = Future()
+    pool.apply_async(
+        func, (arg,), callback=fut.set_result, error_callback=fut.set_exception
+    )
+    return fut
+
+
+def run_parallel_iter(
+    func,
+    lst_args: list,
+    n_process: int = 1,
+    parallel_engine: str = "multiprocess_imap",
+    is_ordered: bool = False,
+    max_in_flight: int = None,
+    show_progress: bool = False,
+    desc: str = None,
+):
+    """
+    Generator of func results, results are yielded as tasks complete and at most max_in_flight tasks are submitted
+    ahead of the consumer, so results which are not consumed yet never pile up
+    :param func: for process engines func and its results must be picklable
+    :param lst_args:
+    :param n_process:
+    :param parallel_engine: same engines as run_paralle_dec
+    :param is_ordered: yield results in the order of lst_args, otherwise in order of completion
+    :param max_in_flight: submitted but not yet consumed tasks, defaults to 2 * n_process
+    :param show_progress:
+    :param desc:
+    :return:
+    """
+    assert (
+        parallel_engine
+        in [
+            "multiprocess_imap",
+            "multiprocess_map",
+            "joblib",
+            "multithreading",
+        ]
+    ), f"{parallel_engine} must be one of : multiprocess_imap, multiprocess_map, joblib, multithreading"
+    if max_in_flight is None:
+        max_in_flight = 2 * n_process
+    assert max_in_flight >= n_process, "max_in_flight must be at least n_process"
+
+    pbar = tqdm(total=len(lst_args), desc=desc, disable=not show_progress)
+    try:
+        if n_process == 1:
+            for arg in lst_args:
+                yield func(arg)
+                pbar.update(1)
+            return None
+
+        if parallel_engine == "multithreading":
+            executor = ThreadPoolExecutor(max_workers=n_process)
+            submit = functools.partial(executor.submit, func)
+        elif parallel_engine == "joblib":
+            # joblib's Parallel keeps dispatching regardless of the consumer, submit to its loky executor instead
+            executor = get_reusable_executor(max_workers=n_process)
+            submit = functools.partial(executor.submit, func)
+        else:
+            executor = multiprocessing.Pool(processes=n_process)
+            submit = functools.partial(_get_pool_future, executor, func)
+
+        iter_args = iter(lst_args)
+        dq_fut = deque()
+        try:
+            while True:
+                while len(dq_fut) < max_in_flight:
+                    arg = next(iter_args, iter_args)
+                    if arg is iter_args:
+                        break
+                    dq_fut.append(submit(arg))
+                if len(dq_fut) == 0:
+                    break
+
+                if is_ordered:
+                    fut = dq_fut.popleft()
+                else:
+                    fut = next(iter(wait(dq_fut, return_when=FIRST_COMPLETED).done))
+                    dq_fut.remove(fut)
+                res = fut.result()
+                del fut
+                yield res
+                pbar.update(1)
+        finally:
+            if parallel_engine == "multithreading":
+                executor.shutdown(wait=True, cancel_futures=True)
+            elif parallel_engine == "joblib":
+                # the reusable executor is kept for later calls, drop pending tasks only
+                for fut in dq_fut:
+                    fut.cancel()
+            else:
+                executor.terminate()
+                executor.join()
+    finally:
+        pbar.close()
+    pass
+
+
 def run_paralle_dec(
     func,
     lst_dct_args=list[dict],
@@ -89,7 +195,26 @@ def run_paralle_dec(
     desc: str = None,
     parallel_engine: str = "multiprocess_imap",
     mp_map_chunksize: int = 50,
+    is_generator: bool = False,
+    is_ordered: bool = False,
+    max_in_flight: int = None,
 ):
+    """
+    Runs func over lst_dct_args in parallel. Tasks are run sequentially until func returns False (no error) for the
+    first time, e.g. to create tables, the results of these runs are not returned.
+    :param func: returns error boolean indicator
+    :param lst_dct_args:
+    :param n_process:
+    :param show_progress:
+    :param is_time_it:
+    :param desc:
+    :param parallel_engine: 'multiprocess_imap', 'multiprocess_map', 'joblib' or 'multithreading'
+    :param mp_map_chunksize:
+    :param is_generator: return generator of results, see run_parallel_iter, results are yielded as they complete
+    :param is_ordered: generator yields results in the order of lst_dct_args
+    :param max_in_flight: generator submits at most max_in_flight tasks ahead of the consumer
+    :return: list of results, generator for is_generator=True
+    """
     assert (
         parallel_engine
         in [
@@ -136,6 +261,18 @@ def run_paralle_dec(
             f"First non-error run at iteration {count}, starting parallel processing now"
         )
 
+    if is_generator:
+        return run_parallel_iter(
+            func,
+            lst_dct_args,
+            n_process=n_process,
+            parallel_engine=parallel_engine,
+            is_ordered=is_ordered,
+            max_in_flight=max_in_flight,
+            show_progress=show_progress,
+            desc=desc,
+        )
+
     # start parallel processing
     obj_iter = lst_dct_args
     if show_progress and ((parallel_engine != "multithreading") or n_process == 1):
@@ -187,6 +324,193 @@ def run_paralle_dec(
     return res
 
 
+_SHM_LOCK = threading.Lock()
+
+
+def _get_shared_memory(name: str) -> shared_memory.SharedMemory:
+    # attach without tracking the segment, only the owner unlinks it
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # python < 3.13 always registers attached segments with the resource tracker, which unlinks them when a
+        # worker exits or reports them as leaked
+        with _SHM_LOCK:
+            register = resource_tracker.register
+            resource_tracker.register = lambda *args, **kwargs: None
+            try:
+                return shared_memory.SharedMemory(name=name)
+            finally:
+                resource_tracker.register = register
+
+
+class _SharedBuffer:
+    """
+    Read only numpy array interface on a shared memory segment, arrays built from it hold the segment as their base so
+    the mapping is only closed once the last view is gone
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, shape: tuple, dtype: np.dtype):
+        self._shm = shm
+        int_address = np.ndarray(
+            (shm.size,), dtype=np.uint8, buffer=shm.buf
+        ).ctypes.data
+        self.__array_interface__ = {
+            "shape": shape,
+            "typestr": dtype.str,
+            "data": (int_address, True),
+            "version": 3,
+        }
+        pass
+
+
+class SharedDataFrame:
+    """
+    Handle of a DataFrame whose numpy numeric, bool and datetime64 columns are copied once into shared memory, one
+    segment per dtype. Task dicts carry the handle instead of the frame, get_df returns the frame with read only
+    zero copy views on the segments in every process. Other columns and non numeric indexes are pickled with the
+    handle. Segments are unlinked by the creating process on unlink, when leaving the with block or at exit.
+        with SharedDataFrame(df) as sdf:
+            res = run_paralle_dec(func, [{"sdf": sdf, "i": i} for i in range(n)], n_process=8)
+    :param df:
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self._pid = os.getpid()
+        self._lst_cols = list(df.columns)
+        self._lst_shm, self._dct_block = [], {}
+
+        dct_cols = {}
+        for i, dtype in enumerate(df.dtypes):
+            if isinstance(dtype, np.dtype) and (dtype.kind in "biufmM"):
+                dct_cols.setdefault(dtype.str, []).append(i)
+
+        for str_dtype, lst_i in dct_cols.items():
+            dtype = np.dtype(str_dtype)
+            shm = shared_memory.SharedMemory(
+                create=True, size=max(1, len(lst_i) * len(df) * dtype.itemsize)
+            )
+            self._lst_shm.append(shm)
+            arr = np.ndarray((len(lst_i), len(df)), dtype=dtype, buffer=shm.buf)
+            for j, i in enumerate(lst_i):
+                arr[j] = df.iloc[:, i].to_numpy()
+            self._dct_block[str_dtype] = (shm.name, lst_i)
+
+        set_shared = {i for lst_i in dct_cols.values() for i in lst_i}
+        self._df_other = df.iloc[
+            :, [i for i in range(df.shape[1]) if i not in set_shared]
+        ]
+        self._n_rows = len(df)
+
+        # numeric and datetime index in its own segment, other indexes are pickled
+        self._index, self._index_block = df.index, None
+        dtype = df.index.dtype
+        if (
+            (not isinstance(df.index, pd.MultiIndex))
+            and isinstance(dtype, np.dtype)
+            and (dtype.kind in "biufmM")
+        ):
+            shm = shared_memory.SharedMemory(
+                create=True, size=max(1, len(df) * dtype.itemsize)
+            )
+            self._lst_shm.append(shm)
+            arr = np.ndarray((len(df),), dtype=dtype, buffer=shm.buf)
+            arr[:] = df.index.to_numpy()
+            self._index_block = (shm.name, dtype.str, df.index.name)
+            self._index = None
+        self._df = None
+        atexit.register(self.unlink)
+        MY_LOGGER.debug(
+            f"{self}: {len(set_shared)} shared columns, {self._df_other.shape[1]} pickled columns"
+        )
+        pass
+
+    def __repr__(self):
+        return f"SharedDataFrame: {self._n_rows} rows, {len(self._lst_cols)} columns"
+
+    def __getstate__(self):
+        # segment names only, frames are rebuilt from the segments
+        return {k: v for k, v in self.__dict__.items() if k not in ["_lst_shm", "_df"]}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lst_shm, self._df = [], None
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.unlink()
+        pass
+
+    def get_df(self) -> pd.DataFrame:
+        """
+        Returns the DataFrame, shared columns are read only views on the shared memory segments
+        """
+        if self._df is not None:
+            return self._df
+        lst_names = [name for name, _ in self._dct_block.values()]
+        if self._index_block is not None:
+            lst_names.append(self._index_block[0])
+        if (os.getpid() != self._pid) or (len(self._lst_shm) != len(lst_names)):
+            self._lst_shm = [_get_shared_memory(name) for name in lst_names]
+
+        dct_arr = {}
+        for shm, (str_dtype, (_, lst_i)) in zip(self._lst_shm, self._dct_block.items()):
+            arr = np.asarray(
+                _SharedBuffer(shm, (len(lst_i), self._n_rows), np.dtype(str_dtype))
+            )
+            for j, i in enumerate(lst_i):
+                dct_arr[i] = arr[j]
+
+        index = self._index
+        if self._index_block is not None:
+            _, str_dtype, name = self._index_block
+            arr = np.asarray(
+                _SharedBuffer(self._lst_shm[-1], (self._n_rows,), np.dtype(str_dtype))
+            )
+            index = pd.Index(arr, name=name, copy=False)
+
+        dct, k = {}, 0
+        for i in range(len(self._lst_cols)):
+            if i in dct_arr:
+                dct[i] = dct_arr[i]
+            else:
+                dct[i] = self._df_other.iloc[:, k].array
+                k += 1
+        df = pd.DataFrame(dct, index=index, copy=False)
+        df.columns = self._lst_cols
+        self._df = df
+        return df
+
+    def close(self):
+        """
+        Drops the frame and the segments of this handle, a segment stays mapped until no column or index view on it
+        is left
+        """
+        self._df = None
+        self._lst_shm = []
+        pass
+
+    def unlink(self):
+        """
+        Frees the segment names, only in the creating process. Views which are still in use stay valid, the memory is
+        released with the last view
+        """
+        if os.getpid() != self._pid:
+            return None
+        lst_shm = self._lst_shm
+        self.close()
+        for shm in lst_shm:
+            try:
+                shm.unlink()
+            except FileNotFoundError:
+                pass
+        self._dct_block = {}
+        atexit.unregister(self.unlink)
+        pass
+
+
 @time_it
 def run_parallel_wrap(
     func, arguments: list, n_process: int = 4, show_progressbar: bool = True, **kwargs
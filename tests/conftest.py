@@ -0,0 +1,15 @@
+import os
+import tempfile
+
+PATH_DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+# lukas_utils loggers and the dtype registry require these at import
+os.environ.setdefault(
+    "PATH_LOG_DIR", os.path.join(tempfile.gettempdir(), "lukas_utils_logs")
+)
+os.environ.setdefault("LEVEL_LOG_STREAM", "30")
+os.environ.setdefault("LEVEL_LOG_FILE", "10")
+os.environ.setdefault("PATH_DTYPE_TOML", os.path.join(PATH_DATA, "dtype.toml"))
+os.environ.setdefault(
+    "PATH_DTYPE_REGEX_TOML", os.path.join(PATH_DATA, "dtype_regex.toml")
+)
@@ -0,0 +1,494 @@
+import functools as ft
+import io
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from lukas_utils.helpers_data import (
+    DF_SCHEMA_CACHE,
+    PERIOD_KEY_CACHE,
+    DtypeRegistry,
+    PeriodKeyCache,
+    _get_data_col_info,
+    _get_df_col_info,
+    df_cast_data,
+    df_downcast_data,
+    get_freq_sparse_df,
+    df_merge_dt_freq,
+    get_freq_adj_df,
+    iter_freq_adj_df,
+    lst_df_merge_dt_freq,
+    lst_df_sort_by_freq,
+)
+
+
+PATH_DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+
+def _get_df(n: int = 200, cols: tuple = ("px_d", "vol_d"), seed: int = 0):
+    rng = np.random.default_rng(seed)
+    idx = pd.date_range("2020-01-01", periods=n, freq="D", name="date", unit="ns")
+    return pd.DataFrame({c: rng.normal(size=n) for c in cols}, index=idx)
+
+
+class TestDtypeRegistry(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        for file in ["dtype.toml", "dtype_regex.toml"]:
+            shutil.copy(os.path.join(PATH_DATA, file), self.tmp.name)
+        self.path_dtype = os.path.join(self.tmp.name, "dtype.toml")
+        self.registry = DtypeRegistry(
+            self.path_dtype, os.path.join(self.tmp.name, "dtype_regex.toml")
+        )
+
+    def test_col_info(self):
+        lst = self.registry.get_lst_col_info(["px_m", "w_px", "unknown"])
+        self.assertEqual(
+            [(c.dtype, c.freq) for c in lst][:2], [("float", "M"), ("float", "W")]
+        )
+        self.assertTrue(lst[2].is_default)
+
+        self.registry.get_lst_col_info(["px_m"])
+        self.assertEqual(self.registry.get_stats()["n_loads"], 1)
+        self.assertEqual(self.registry.get_stats()["n_hits"], 1)
+
+        # dct_dtype update is resolved separately
+        c = self.registry.get_col_info(
+            "px_m", dct_dtype={"px_m": {"dtype": "int", "freq": "Q"}}
+        )
+        self.assertEqual((c.dtype, c.freq), ("int", "Q"))
+        self.assertEqual(self.registry.get_col_info("px_m").freq, "M")
+
+    def test_reload_on_change(self):
+        self.assertEqual(self.registry.get_col_info("px_new").is_default, True)
+        with open(self.path_dtype, "a") as f:
+            f.write('\n[px_new]\ndtype = "int"\nfreq = "W"\n')
+        stat = os.stat(self.path_dtype)
+        os.utime(self.path_dtype, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+        c = self.registry.get_col_info("px_new")
+        self.assertEqual((c.dtype, c.freq, c.is_default), ("int", "W", False))
+        self.assertEqual(self.registry.get_stats()["n_loads"], 2)
+
+    def test_single_match_equals_per_pattern(self):
+        dct_regex = {
+            "^[a-z]+_[a-z](?=_diff$)": {"dtype": "", "freq": "", "is_suffix": True},
+            "(?<=^pq\\d_)[a-z]+_[a-z]": {"dtype": "", "freq": "", "is_suffix": True},
+            "^cnt_": {"dtype": "int", "freq": "M", "is_suffix": False},
+            "_z$": {"dtype": "str", "freq": "D", "is_suffix": False},
+        }
+        lst_cols = [
+            "px_m_diff",
+            "pq3_px_q",
+            "pq3_px_q_diff",
+            "w_vol_d_diff",
+            "cnt_px_m_diff",
+            "cnt_a_z",
+            "w_a",
+            "px_y",
+            "other",
+            "other_diff",
+        ]
+        dct_d, dct_r = self.registry.get_dicts(dct_regex=dct_regex)
+        self.assertIsNotNone(self.registry._get_view(dct_regex=dct_regex).p_all)
+
+        lst_new = self.registry.get_lst_col_info(lst_cols, dct_regex=dct_regex)
+        lst_old = [_get_data_col_info(c, dct_d, dct_r) for c in lst_cols]
+        for c_new, c_old in zip(lst_new, lst_old):
+            self.assertEqual(
+                (
+                    c_new.name,
+                    c_new.dtype,
+                    c_new.freq,
+                    c_new.dtype_sql,
+                    c_new.is_default,
+                ),
+                (
+                    c_old.name,
+                    c_old.dtype,
+                    c_old.freq,
+                    c_old.dtype_sql,
+                    c_old.is_default,
+                ),
+            )
+        self.assertEqual(
+            [(c.dtype, c.freq, c.is_default) for c in lst_new[:3]],
+            [("float", "M", False), ("float", "Q", False), ("float", "Q", False)],
+        )
+
+    def test_invalid_toml(self):
+        with open(self.path_dtype, "a") as f:
+            f.write('\n[px_bad]\nfreq = "W"\n')
+        with self.assertRaises(TypeError):
+            self.registry.get_col_info("px_m")
+
+
+class TestDfSchema(unittest.TestCase):
+    def test_input_not_modified(self):
+        df = _get_df()
+        lst_df_sort_by_freq([df, _get_df(cols=("px_m",))])
+        d = get_freq_adj_df(df)
+        self.assertEqual(df.attrs, {})
+        self.assertEqual(d.attrs, {})
+        for x in [df, d]:
+            x.to_parquet(io.BytesIO())
+            pickle.dumps(x)
+
+    def test_schema_reused(self):
+        df = _get_df(cols=("px_d", "px_m"))
+        get_freq_adj_df(df)
+        self.assertIsNotNone(DF_SCHEMA_CACHE._dct_schema.get(id(df)))
+        pd.testing.assert_frame_equal(get_freq_adj_df(df), get_freq_adj_df(df.copy()))
+
+        n_frames = DF_SCHEMA_CACHE.get_stats()["n_frames"]
+        del df
+        self.assertEqual(DF_SCHEMA_CACHE.get_stats()["n_frames"], n_frames - 1)
+
+
+def _get_df_idx(cols: tuple, idx, name: str = None, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    idx = pd.DatetimeIndex(idx, name=name).as_unit("ns")
+    return pd.DataFrame({c: rng.normal(size=len(idx)) for c in cols}, index=idx)
+
+
+class TestLstDfMergeDtFreq(unittest.TestCase):
+    def setUp(self):
+        idx_d = pd.bdate_range("2019-12-20", "2021-03-10")
+        self.lst_df = [
+            _get_df_idx(
+                ("px_m",), pd.date_range("2019-06-01", "2021-06-01", freq="MS")
+            ),
+            _get_df_idx(("px_d", "vol_d"), idx_d, name="date", seed=1),
+            _get_df_idx(
+                ("px_q",), pd.date_range("2018-01-01", "2022-01-01", freq="QS")
+            ),
+            _get_df_idx(
+                ("w_px",), pd.date_range("2020-01-06", "2020-12-28", freq="W-MON")
+            ),
+            _get_df_idx(
+                ("px_y",), pd.date_range("2015-01-01", "2025-01-01", freq="YS")
+            ),
+        ]
+        ser = pd.Series(np.arange(len(idx_d[::3])), index=idx_d[::3].as_unit("ns"))
+        self.lst_df.append(ser.rename("n_d").to_frame())
+
+    def test_equals_pairwise_merge(self):
+        for how in ["outer", "left"]:
+            for lst_i in [
+                [0, 1],
+                [1, 0, 2],
+                [0, 2, 4],
+                [1, 2, 3, 4, 5],
+                [5, 4, 3, 2, 1, 0],
+            ]:
+                lst_df = [self.lst_df[i] for i in lst_i]
+                df_pairwise = ft.reduce(
+                    lambda left, right: df_merge_dt_freq(
+                        left, right, str_merge_how=how
+                    ),
+                    lst_df_sort_by_freq(lst_df),
+                )
+                pd.testing.assert_frame_equal(
+                    lst_df_merge_dt_freq(lst_df, how=how),
+                    df_pairwise,
+                    check_freq=False,
+                    obj=f"{how} {lst_i}",
+                )
+
+    def test_inputs_not_modified(self):
+        lst_copy = [df.copy() for df in self.lst_df]
+        lst_df_merge_dt_freq(self.lst_df)
+        for df, df_copy in zip(self.lst_df, lst_copy):
+            pd.testing.assert_frame_equal(df, df_copy)
+
+
+_DCT_DTYPE_CAST = {
+    "cat": {"dtype": "category", "freq": "D"},
+    "cat_o": {"dtype": "categoryO", "freq": "D"},
+    "flag": {"dtype": "bool", "freq": "D"},
+    "n_a": {"dtype": "int", "freq": "D"},
+    "n_b": {"dtype": "int", "freq": "D"},
+}
+
+
+def _df_cast_data_per_col(df: pd.DataFrame, dct_dtype: dict) -> pd.DataFrame:
+    # column by column cast of df_cast_data before grouping by dtype
+    df = df.copy()
+    for dtype in _get_df_col_info(df, dct_dtype, None):
+        try:
+            if dtype.dtype == "category":
+                df[dtype.name] = df[dtype.name].astype(object).astype("category")
+            elif dtype.dtype == "categoryO":
+                df[dtype.name] = pd.Categorical(
+                    df[dtype.name].astype(object), ordered=True
+                )
+            else:
+                df[dtype.name] = df[dtype.name].astype(dtype.dtype)
+        except Exception:
+            pass
+    return df
+
+
+class TestDfCastData(unittest.TestCase):
+    def setUp(self):
+        self.df = pd.DataFrame(
+            {
+                "name": pd.Series(["a", "bb", None, "a"], dtype=object),
+                "cat": ["x", "y", "x", "z"],
+                "cat_o": ["b", "a", "c", "a"],
+                "flag": [1, 0, 0, 1],
+                "n_a": [1.0, 2.0, 3.0, 4.0],
+                "n_b": [5.0, 6.0, 7.0, 8.0],
+                "px_d": [1, 2, 3, 4],
+                "calendardate": [
+                    "2020-01-01",
+                    "2020-01-02",
+                    "2020-01-03",
+                    "2020-01-06",
+                ],
+            }
+        )
+
+    def _assert_equal_per_col(self, df: pd.DataFrame):
+        df_copy = df.copy()
+        df_old = _df_cast_data_per_col(df, _DCT_DTYPE_CAST)
+        pd.testing.assert_frame_equal(
+            df_cast_data(df, dct_dtype=_DCT_DTYPE_CAST, str_backend="python"), df_old
+        )
+        pd.testing.assert_frame_equal(df, df_copy)
+
+        df_inplace = df.copy()
+        d = df_cast_data(
+            df_inplace, dct_dtype=_DCT_DTYPE_CAST, inplace=True, str_backend="python"
+        )
+        self.assertIs(d, df_inplace)
+        pd.testing.assert_frame_equal(d, df_old)
+        return df_old
+
+    def test_equals_per_col(self):
+        df = self._assert_equal_per_col(self.df)
+        self.assertEqual(df["cat_o"].cat.ordered, True)
+        self.assertEqual(
+            [str(t) for t in df.dtypes[["flag", "n_a", "px_d", "calendardate"]]],
+            ["bool", "int64", "float64", "datetime64[ns]"],
+        )
+
+    def test_varchar_warning(self):
+        with self.assertLogs("helpers_data", level="WARNING") as logs:
+            df_cast_data(pd.DataFrame({"name": [None, None]}))
+            df_cast_data(pd.DataFrame({"name": ["a" * 26, None]}))
+        self.assertEqual(
+            logs.output, ["WARNING:helpers_data:name exceeds SQL varchar length 25"]
+        )
+
+    def test_fallback_after_failed_group(self):
+        # n_a fails, the grouped astype falls back to per group and per column casts
+        self.df["n_a"] = pd.Series([1.0, "x", 3.0, 4.0], dtype=object)
+        df = self._assert_equal_per_col(self.df)
+        self.assertEqual(df["n_a"].dtype, object)
+        self.assertEqual(df["n_b"].dtype, np.int64)
+        self.assertEqual(df["cat"].dtype, "category")
+
+
+def _get_freq_sparse_df_per_col(df: pd.DataFrame, sparse_kind: str) -> pd.DataFrame:
+    # column by column sparsification of get_freq_sparse_df before bucketing by frequency
+    hf = max(_get_df_col_info(df, None, None), key=lambda d: d.freq_ordinary).freq
+    df = df.asfreq(hf).sort_index()
+    for dtype in _get_df_col_info(df, None, None):
+        grouped = df.groupby(df.index.to_period(dtype.freq).to_timestamp())
+        ser = getattr(grouped[dtype.name], sparse_kind)()
+        df = df.drop(dtype.name, axis=1).join(ser, how="outer")
+    return df.dropna(thresh=1)
+
+
+class TestGetFreqSparseDf(unittest.TestCase):
+    def setUp(self):
+        self.df = _get_df(n=300, cols=("px_d", "px_m", "w_px", "vol_d", "px_q"))
+        self.df.iloc[::5, 0] = np.nan
+        self.df.iloc[:45, 1] = np.nan
+        self.df.iloc[100:130, 2] = np.nan
+
+    def test_equals_per_col(self):
+        for sparse_kind in ["first", "last"]:
+            pd.testing.assert_frame_equal(
+                get_freq_sparse_df(self.df, sparse_kind=sparse_kind),
+                _get_freq_sparse_df_per_col(self.df, sparse_kind),
+                check_freq=False,
+                obj=sparse_kind,
+            )
+
+
+class TestPeriodKeyCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = PeriodKeyCache(max_size=2)
+        self.idx = _get_df(n=100).index
+
+    def test_hit(self):
+        key = self.cache.get(self.idx, "M")
+        # equal index values share the entry
+        self.assertIs(self.cache.get(self.idx.copy(), "M"), key)
+        self.assertEqual(self.cache.get_stats()["n_hits"], 1)
+
+        periods = self.idx.to_period("M")
+        np.testing.assert_array_equal(key.periods_unique.take(key.codes), periods)
+        pd.testing.assert_index_equal(key.timestamps, periods.to_timestamp())
+
+    def test_miss_on_changed_index(self):
+        self.cache.get(self.idx, "M")
+        self.cache.get(self.idx.shift(1, freq="D"), "M")
+        self.cache.get(self.idx.rename("other"), "M")
+        self.cache.get(self.idx, "Q")
+        self.assertEqual(self.cache.get_stats()["n_misses"], 4)
+        self.assertEqual(self.cache.get_stats()["n_hits"], 0)
+
+    def test_evict_lru(self):
+        self.cache.get(self.idx, "M")
+        self.cache.get(self.idx, "Q")
+        self.cache.get(self.idx, "M")
+        self.cache.get(self.idx, "Y")
+        self.assertEqual(self.cache.get_stats()["n_keys"], 2)
+
+        # Q was used least recently and is evicted, M is kept
+        self.cache.get(self.idx, "M")
+        self.cache.get(self.idx, "Q")
+        self.assertEqual(
+            self.cache.get_stats(), {"n_hits": 2, "n_misses": 4, "n_keys": 2}
+        )
+
+
+class TestDfDowncastData(unittest.TestCase):
+    def setUp(self):
+        self.dct_dtype = {
+            "n_a": {"dtype": "int", "freq": "D"},
+            "px_a": {"dtype": "float64", "freq": "D"},
+            "n_b": {"dtype": "int64", "freq": "D"},
+            "n_c": {"dtype": "Int64", "freq": "D"},
+            "cat": {"dtype": "category", "freq": "D"},
+        }
+        self.df = pd.DataFrame(
+            {
+                "n_a": [1.0, 2.0, np.nan, 300.0],
+                "n_d": [1, 2, 3, 4],
+                "px_d": [0.5, 0.25, 1.0, 2.0],
+                "px_m": [0.1, 0.2, 0.3, 0.4],
+                "px_a": [1.0, 1.0, 1.0, 2.0],
+                "n_b": np.array([1, 1, 1, 2], dtype=np.int64),
+                "n_c": pd.array([1, 1, None, 2], dtype="Int64"),
+                "name": pd.Series(["a", "a", "a", "b"], dtype=object),
+                "cat": pd.Categorical(["x", "y", "x", "y"]),
+            }
+        )
+
+    def test_dtypes(self):
+        df, df_mem = df_downcast_data(self.df, dct_dtype=self.dct_dtype)
+        self.assertEqual(
+            df.dtypes.astype(str).to_dict(),
+            {
+                "n_a": "Int16",
+                "n_d": "int8",
+                "px_d": "float32",
+                "px_m": "float64",
+                "px_a": "float64",
+                "n_b": "int64",
+                "n_c": "Int64",
+                "name": "category",
+                "cat": "category",
+            },
+        )
+        pd.testing.assert_frame_equal(
+            df.astype(self.df.dtypes.to_dict()), self.df, check_dtype=False
+        )
+        self.assertEqual(df_mem.loc["px_a", "dtype_after"], "float64")
+        self.assertEqual(self.df["name"].dtype, object)
+
+    def test_str_unique(self):
+        df = pd.DataFrame({"name": ["a", "b", "c", None]})
+        df, _ = df_downcast_data(df, cat_max_ratio=0.5)
+        self.assertIsInstance(df["name"].dtype, pd.StringDtype)
+
+
+class TestStrBackend(unittest.TestCase):
+    def setUp(self):
+        idx = pd.date_range("2020-01-01", periods=6, freq="D", name="date", unit="ns")
+        self.df = pd.DataFrame(
+            {
+                "name": ["a", "b", None, "a", "c", "d"],
+                "cat": ["x", "y", "x", "x", "y", "x"],
+                "px_d": np.arange(6.0),
+            },
+            index=idx,
+        )
+        self.dct_dtype = {"cat": {"dtype": "category", "freq": "D"}}
+
+    def test_df_cast_data(self):
+        for dtype_in in ["str", object]:
+            df = self.df.astype({"name": dtype_in, "cat": dtype_in})
+            d = df_cast_data(df, dct_dtype=self.dct_dtype, str_backend="python")
+            self.assertEqual(d["name"].dtype, pd.StringDtype(na_value=np.nan))
+            self.assertEqual(d["cat"].cat.categories.dtype, pd.Index(["x", "y"]).dtype)
+
+            d = df_cast_data(df, dct_dtype=self.dct_dtype, str_backend="pyarrow")
+            self.assertEqual(d["name"].dtype, "string[pyarrow]")
+            self.assertEqual(d["cat"].cat.categories.dtype, "string[pyarrow]")
+            self.assertEqual(d["name"].isna().sum(), 1)
+
+    def test_get_freq_sparse_df(self):
+        for dtype_in in ["str", object]:
+            df = self.df.astype({"name": dtype_in})
+            d = get_freq_sparse_df(df, str_backend="python")
+            self.assertEqual(d["name"].dtype, df["name"].dtype)
+
+            d = get_freq_sparse_df(df, str_backend="pyarrow")
+            self.assertEqual(d["name"].dtype, "string[pyarrow]")
+            self.assertEqual(d["name"].dropna().tolist(), df["name"].dropna().tolist())
+            self.assertEqual(d["name"].isna().sum(), 1)
+            self.assertEqual(df["name"].dtype, pd.api.types.pandas_dtype(dtype_in))
+
+
+class TestIterFreqAdjDf(unittest.TestCase):
+    def setUp(self):
+        self.df = _get_df(n=400, cols=("px_d", "px_m"))
+        self.df.iloc[::7, 0] = np.nan
+        self.df.iloc[:40, 1] = np.nan
+
+    def _get_df_iter(self, agg_obs: str, **kwargs) -> pd.DataFrame:
+        iter_df = (self.df.iloc[i : i + 37] for i in range(0, len(self.df), 37))
+        return pd.concat(list(iter_freq_adj_df(iter_df, agg_obs=agg_obs, **kwargs)))
+
+    def test_equals_get_freq_adj_df(self):
+        for agg_obs in ["first", "last", "mean"]:
+            pd.testing.assert_frame_equal(
+                self._get_df_iter(agg_obs),
+                get_freq_adj_df(self.df, agg_obs=agg_obs),
+                check_freq=False,
+                obj=agg_obs,
+            )
+
+    def test_series(self):
+        iter_ser = (self.df["px_d"].iloc[i : i + 50] for i in range(0, 400, 50))
+        pd.testing.assert_series_equal(
+            pd.concat(list(iter_freq_adj_df(iter_ser, freq="M"))),
+            get_freq_adj_df(self.df[["px_d", "px_m"]])["px_d"],
+            check_freq=False,
+        )
+
+    def test_period_keys_not_cached(self):
+        PERIOD_KEY_CACHE.clear()
+        self._get_df_iter("mean")
+        self.assertEqual(PERIOD_KEY_CACHE.get_stats()["n_keys"], 0)
+
+    def test_median(self):
+        with self.assertRaises(KeyError):
+            self._get_df_iter("median")
+        df = self._get_df_iter("median", is_median_approx=True)
+        self.assertEqual(df.index.tolist(), get_freq_adj_df(self.df).index.tolist())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,939 @@
+import os
+import pickle
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+import sqlalchemy
+
+import lukas_utils.helpers_sql as helpers_sql
+
+
+class TestSqlEngineRegistry(unittest.TestCase):
+    def setUp(self):
+        self.registry = helpers_sql.SqlEngineRegistry(host="host_a")
+        self.addCleanup(self.registry.dispose)
+
+    def test_key_host(self):
+        engine = self.registry.get_engine("db", user="u", pw="p")
+        self.assertIs(self.registry.get_engine("db", user="u", pw="p"), engine)
+        self.assertEqual(engine.url.host, "host_a")
+
+        engine_b = self.registry.get_engine("db", user="u", pw="p", host="host_b")
+        self.assertIsNot(engine_b, engine)
+        self.assertEqual(engine_b.url.host, "host_b")
+        self.assertEqual(
+            self.registry.get_stats()["host"].tolist(), ["host_a", "host_b"]
+        )
+
+    @unittest.skipUnless(hasattr(os, "fork"), "requires os.fork")
+    def test_fork_replaces_pool(self):
+        engine = self.registry.get_engine("db", user="u", pw="p")
+        int_pool = id(engine.pool)
+        fd_r, fd_w = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            # engine held directly by the caller gets a new pool in the child
+            is_new = (id(engine.pool) != int_pool) and (
+                self.registry.get_engine("db", user="u", pw="p") is engine
+            )
+            os.write(fd_w, b"1" if is_new else b"0")
+            os._exit(0)
+        os.close(fd_w)
+        self.assertEqual(os.read(fd_r, 1), b"1")
+        os.close(fd_r)
+        os.waitpid(pid, 0)
+        self.assertEqual(id(engine.pool), int_pool)
+
+
+class _ErrnoError(Exception):
+    def __init__(self, errno: int):
+        super().__init__(f"errno {errno}")
+        self.errno = errno
+
+
+class _FakeCursor:
+    # cursor over fixed rows, records executed statements and fetch sizes
+    def __init__(self, lst_cols: list, lst_rows: list):
+        self.description = [(c,) for c in lst_cols]
+        self.lst_rows = lst_rows
+        self.lst_sql, self.lst_fetch = [], []
+        self.is_closed = False
+
+    def execute(self, str_sql, params=None):
+        self.lst_sql.append((str_sql, params))
+
+    def fetchmany(self, n: int) -> list:
+        self.lst_fetch.append(n)
+        lst, self.lst_rows = self.lst_rows[:n], self.lst_rows[n:]
+        return lst
+
+    def fetchone(self):
+        return self.lst_rows[0]
+
+    def close(self):
+        self.is_closed = True
+
+
+class TestSqlRetryPolicy(unittest.TestCase):
+    def setUp(self):
+        self.policy = helpers_sql.SqlRetryPolicy(
+            max_attempts=4, base_delay=1, max_delay=3, breaker_threshold=6
+        )
+        self.sleep = mock.patch.object(helpers_sql.time, "sleep").start()
+        self.addCleanup(mock.patch.stopall)
+
+    def test_is_transient(self):
+        for e in [
+            _ErrnoError(2006),
+            _ErrnoError(1213),
+            ConnectionError(),
+            TimeoutError(),
+        ]:
+            self.assertTrue(helpers_sql._is_sql_error_transient(e), e)
+        for e in [
+            _ErrnoError(1062),
+            KeyError("a"),
+            helpers_sql.SqlCircuitOpenError(),
+        ]:
+            self.assertFalse(helpers_sql._is_sql_error_transient(e), e)
+
+        # sqlalchemy wraps the driver error
+        e = sqlalchemy.exc.OperationalError("SELECT 1", None, _ErrnoError(2013))
+        self.assertTrue(helpers_sql._is_sql_error_transient(e))
+
+    def test_delay(self):
+        for attempt, delay_max in [(0, 1), (1, 2), (2, 3), (8, 3)]:
+            with mock.patch.object(helpers_sql.random, "uniform", side_effect=max):
+                self.assertEqual(self.policy.get_delay(attempt), delay_max)
+
+    def test_retry_transient(self):
+        func = mock.Mock(side_effect=[_ErrnoError(2006), _ErrnoError(2013), "ok"])
+        self.assertEqual(self.policy.run(func, 1, a=2), "ok")
+        func.assert_called_with(1, a=2)
+        self.assertEqual(self.sleep.call_count, 2)
+        self.assertEqual(self.policy.get_stats()["n_retries"], 2)
+
+    def test_permanent_raised(self):
+        func = mock.Mock(side_effect=_ErrnoError(1062))
+        with self.assertRaises(_ErrnoError):
+            self.policy.run(func)
+        self.assertEqual(func.call_count, 1)
+        self.sleep.assert_not_called()
+
+    def test_attempts_exhausted(self):
+        func = mock.Mock(side_effect=_ErrnoError(2006))
+        with self.assertRaises(_ErrnoError):
+            self.policy.run(func)
+        self.assertEqual(func.call_count, 4)
+        self.assertEqual(self.policy.get_stats()["n_failures"], 1)
+
+    def test_circuit_breaker(self):
+        func = mock.Mock(side_effect=_ErrnoError(2003))
+        for _ in range(2):
+            with self.assertRaises(_ErrnoError):
+                self.policy.run(func)
+        # threshold of 6 consecutive transient failures reached in the second call
+        self.assertEqual(func.call_count, 6)
+        self.assertTrue(self.policy.is_open())
+        with self.assertRaises(helpers_sql.SqlCircuitOpenError):
+            self.policy.run(func)
+        self.assertEqual(func.call_count, 6)
+
+        # next call after the cooldown tests the server again
+        self.policy._t_open_until = 0
+        func.side_effect = None
+        func.return_value = "ok"
+        self.assertEqual(self.policy.run(func), "ok")
+        self.assertFalse(self.policy.is_open())
+
+
+class _FailCursor(_FakeCursor):
+    # raises the next error of lst_err for each INSERT, None lets the INSERT pass
+    def __init__(self, lst_err: list):
+        super().__init__([], [(10**6,)])
+        self.lst_err = lst_err
+
+    def execute(self, str_sql, params=None):
+        super().execute(str_sql, params)
+        if str_sql.startswith("INSERT") and (len(self.lst_err) > 0):
+            e = self.lst_err.pop(0)
+            if e is not None:
+                raise e
+
+
+class TestSqlWriteRetry(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.policy = helpers_sql.SqlRetryPolicy(
+            max_attempts=3, dead_letter_dir=self.tmp.name
+        )
+        self.is_transactional = False
+        for patcher in [
+            mock.patch.object(helpers_sql, "SQL_RETRY_POLICY", self.policy),
+            mock.patch.object(helpers_sql.time, "sleep"),
+            mock.patch.object(
+                helpers_sql,
+                "_is_sql_tab_transactional",
+                side_effect=lambda *args: self.is_transactional,
+            ),
+        ]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.df = pd.DataFrame({"n_d": np.arange(5), "px_d": np.arange(5.0)})
+
+    def _write(self, lst_err: list, if_exists: str = "append", **kwargs) -> bool:
+        self.cursor = _FailCursor(lst_err)
+        self.sql_eng = mock.MagicMock()
+        self.sql_eng.engine.dialect.name = "mysql"
+        sql_con = self.sql_eng.engine.raw_connection.return_value
+        sql_con.cursor.return_value = self.cursor
+        for k, v in kwargs.items():
+            setattr(sql_con, k, v)
+        dct_write = dict(
+            tab_name="tab",
+            sql_eng=self.sql_eng,
+            if_exists=if_exists,
+            is_index=False,
+            chunksize=500,
+            method=None,
+            bulk_strategy="load_data",
+        )
+        with mock.patch.object(
+            helpers_sql.SQL_SCHEMA_CACHE, "get_key_columns", return_value=["n_d"]
+        ):
+            return helpers_sql._write_df_to_sql_retry(self.df, "db", dct_write)
+
+    def _get_n_insert(self) -> int:
+        return len([sql for sql, _ in self.cursor.lst_sql if sql.startswith("INSERT")])
+
+    def _get_lst_spill(self) -> list:
+        lst = []
+        for root, _, lst_files in os.walk(self.tmp.name):
+            for file in lst_files:
+                with open(os.path.join(root, file), "rb") as f:
+                    lst.append(pickle.load(f))
+        return lst
+
+    def test_partial_not_retried(self):
+        # rows sent to a MyISAM table stay written, a retry would duplicate them
+        self.assertFalse(self._write([_ErrnoError(2013)]))
+        self.assertEqual(self._get_n_insert(), 1)
+        self.assertEqual([d["is_partial"] for d in self._get_lst_spill()], [True])
+
+    def test_connect_retried(self):
+        sql_con = mock.MagicMock()
+        sql_con.cursor.return_value = _FailCursor([])
+        sql_eng = mock.MagicMock()
+        sql_eng.engine.dialect.name = "mysql"
+        sql_eng.engine.raw_connection.side_effect = [_ErrnoError(2003), sql_con]
+        dct_write = dict(
+            tab_name="tab",
+            sql_eng=sql_eng,
+            if_exists="append",
+            is_index=False,
+            chunksize=500,
+            method=None,
+            bulk_strategy="load_data",
+        )
+        self.assertTrue(helpers_sql._write_df_to_sql_retry(self.df, "db", dct_write))
+        self.assertEqual(sql_eng.engine.raw_connection.call_count, 2)
+        sql_con.commit.assert_called_once()
+
+    def test_transactional_retried(self):
+        self.is_transactional = True
+        self.assertTrue(self._write([_ErrnoError(2013), None]))
+        self.assertEqual(self._get_n_insert(), 2)
+        self.assertEqual(self._get_lst_spill(), [])
+
+    def test_commit_not_retried(self):
+        # the commit may have succeeded before the connection was lost
+        self.is_transactional = True
+        commit = mock.Mock(side_effect=_ErrnoError(2013))
+        self.assertFalse(self._write([], commit=commit))
+        self.assertEqual(commit.call_count, 1)
+        self.assertEqual([d["is_partial"] for d in self._get_lst_spill()], [True])
+
+    def test_upsert_retried(self):
+        self.assertTrue(self._write([_ErrnoError(1213), None], if_exists="upsert"))
+        self.assertEqual(self._get_n_insert(), 2)
+
+    def test_replay_partial(self):
+        dct_write = dict(
+            tab_name="tab",
+            if_exists="append",
+            is_index=False,
+            chunksize=500,
+            method=None,
+            bulk_strategy="load_data",
+        )
+        self.policy.spill(self.df, "db", dct_write, is_partial=True)
+        lst_df, lst_res = [], []
+        for lst_keys in [[], ["n_d"]]:
+            with (
+                mock.patch.object(helpers_sql, "get_sql_engine"),
+                mock.patch.object(
+                    helpers_sql.SQL_SCHEMA_CACHE,
+                    "get_key_columns",
+                    return_value=lst_keys,
+                ),
+                mock.patch.object(
+                    helpers_sql,
+                    "_get_df_new_keys",
+                    side_effect=lambda df, *args: df.iloc[2:],
+                ),
+                mock.patch.object(
+                    helpers_sql,
+                    "_write_df_to_sql_method",
+                    side_effect=lambda df, **kwargs: lst_df.append(df),
+                ),
+            ):
+                lst_res.append(helpers_sql.replay_sql_dead_letter().iloc[0])
+
+        # without key the file is kept, with key only rows missing in the table are written
+        self.assertEqual([d["is_written"] for d in lst_res], [False, True])
+        self.assertIn("no key", lst_res[0]["error"])
+        self.assertEqual(len(lst_df), 1)
+        pd.testing.assert_frame_equal(lst_df[0], self.df.iloc[2:])
+        self.assertEqual(self._get_lst_spill(), [])
+
+
+class TestSqlTabsFromLst(unittest.TestCase):
+    def test_failed_table_not_created(self):
+        def execute(str_sql):
+            if ("CREATE TABLE" in str_sql) and ("tab_bad" in str_sql):
+                raise RuntimeError("create failed")
+
+        sql_eng = mock.MagicMock()
+        sql_eng.raw_connection.return_value.cursor.return_value.execute = execute
+        lst_dct_tab = [
+            {"tab_name": name, "lst_cols": ["calendardate", "px_d", "vol_d"]}
+            for name in ["tab_ok", "tab_bad"]
+        ]
+        with (
+            mock.patch.object(helpers_sql, "get_sql_engine", return_value=sql_eng),
+            mock.patch.object(
+                helpers_sql.SQL_SCHEMA_CACHE, "get_tables", return_value=set()
+            ),
+            mock.patch.object(helpers_sql, "DCT_DEFERRED_INDEX", {}) as dct_deferred,
+            self.assertLogs("helpers_sql", level="INFO") as logs,
+        ):
+            df = helpers_sql.get_sql_tabs_from_lst(
+                lst_dct_tab,
+                "db",
+                lst_index=["calendardate", "px_d"],
+                is_defer_index=True,
+            )
+            self.assertEqual(list(dct_deferred.keys()), [("db", "tab_ok")])
+
+        self.assertEqual(
+            df.set_index("tab_name")["is_created"].to_dict(),
+            {"tab_ok": True, "tab_bad": False},
+        )
+        self.assertIn("INFO:helpers_sql:created: db.tab_ok", logs.output)
+        self.assertNotIn("INFO:helpers_sql:created: db.tab_bad", logs.output)
+
+
+class TestSqlTabDdl(unittest.TestCase):
+    def setUp(self):
+        self.lst_sql = []
+        self.sql_eng = mock.MagicMock()
+        self.sql_eng.raw_connection.return_value.cursor.return_value.execute = (
+            lambda str_sql: self.lst_sql.append(" ".join(str_sql.split()))
+        )
+        self.dct_deferred = {}
+        for patcher in [
+            mock.patch.object(helpers_sql, "get_sql_engine", return_value=self.sql_eng),
+            mock.patch.object(
+                helpers_sql.SQL_SCHEMA_CACHE, "is_table", return_value=False
+            ),
+            mock.patch.object(helpers_sql, "DCT_DEFERRED_INDEX", self.dct_deferred),
+        ]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _create(self, **kwargs):
+        helpers_sql.get_sql_tab_from_df(
+            "tab",
+            "db",
+            lst_cols=["calendardate", "px_d", "vol_d", "name"],
+            lst_index=["calendardate", ("name",), ("px_d", "vol_d")],
+            **kwargs,
+        )
+
+    def test_index_with_table(self):
+        self._create()
+        self.assertEqual(len(self.lst_sql), 3)
+        self.assertEqual(self.lst_sql[0], "drop table if exists db.tab")
+        self.assertEqual(
+            self.lst_sql[1],
+            "CREATE TABLE IF NOT EXISTS db.tab ( calendardate datetime, "
+            "px_d double default null, vol_d double default null, name varchar(25) default null, "
+            "KEY `Index_1` ( calendardate ) USING BTREE ) ENGINE=MyISAM DEFAULT CHARSET=utf8mb4",
+        )
+        self.assertEqual(
+            self.lst_sql[2],
+            "ALTER TABLE db.tab ADD INDEX idx1 (name), ADD INDEX idx2 (px_d, vol_d)",
+        )
+        self.assertEqual(self.dct_deferred, {})
+
+    def test_defer_index(self):
+        self._create(
+            storage_engine="InnoDB",
+            row_format="DYNAMIC",
+            is_defer_index=True,
+            is_unique_index=True,
+        )
+        self.assertEqual(len(self.lst_sql), 2)
+        self.assertTrue(
+            self.lst_sql[1].endswith(
+                "UNIQUE KEY `Index_1` ( calendardate ) USING BTREE ) "
+                "ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 ROW_FORMAT=DYNAMIC"
+            )
+        )
+        self.assertEqual(
+            self.dct_deferred, {("db", "tab"): [("name",), ("px_d", "vol_d")]}
+        )
+
+        self.lst_sql.clear()
+        helpers_sql.build_sql_tab_index("tab", "db")
+        self.assertEqual(
+            self.lst_sql,
+            ["ALTER TABLE db.tab ADD INDEX idx1 (name), ADD INDEX idx2 (px_d, vol_d)"],
+        )
+        self.assertEqual(self.dct_deferred, {})
+
+        # nothing deferred left, no statement
+        self.lst_sql.clear()
+        helpers_sql.build_sql_tab_index("tab", "db")
+        self.assertEqual(self.lst_sql, [])
+
+    def test_storage_engine(self):
+        with self.assertRaises(AssertionError):
+            self._create(storage_engine="MEMORY")
+        self.assertEqual(self.lst_sql, [])
+
+
+class TestWriteDfToSqlAppendNew(unittest.TestCase):
+    def setUp(self):
+        self.sql_eng = sqlalchemy.create_engine("sqlite://")
+        pd.DataFrame(
+            {
+                "calendardate": ["2020-01-01 00:00:00", "2020-01-02 00:00:00"],
+                "name": ["a", "a"],
+                "px_d": [1.0, 2.0],
+            }
+        ).to_sql("tab", self.sql_eng, index=False)
+
+    def _get_df_written(self, df: pd.DataFrame, is_index: bool = False):
+        lst_df = []
+        with (
+            mock.patch.object(
+                helpers_sql.SQL_SCHEMA_CACHE,
+                "get_columns",
+                return_value=["calendardate", "name", "px_d"],
+            ),
+            mock.patch.object(
+                helpers_sql.SQL_SCHEMA_CACHE,
+                "get_key_columns",
+                return_value=["calendardate", "name"],
+            ),
+            mock.patch.object(
+                helpers_sql,
+                "_write_df_to_sql_limited",
+                side_effect=lambda df, db_name, dct_write: lst_df.append(df),
+            ),
+        ):
+            helpers_sql.write_df_to_sql(
+                df, "tab", self.sql_eng, if_exists="append_new", is_index=is_index
+            )
+        return lst_df[0] if len(lst_df) > 0 else None
+
+    def test_composite_key(self):
+        df = pd.DataFrame(
+            {
+                "calendardate": pd.to_datetime(
+                    ["2020-01-01", "2020-01-01", "2020-01-02", "2020-01-03"]
+                ),
+                "name": ["a", "b", "a", "a"],
+                "px_d": [1.0, 2.0, 3.0, 4.0],
+            }
+        )
+        d = self._get_df_written(df)
+        self.assertEqual(d["name"].tolist(), ["b", "a"])
+        self.assertEqual(
+            d["calendardate"].tolist(),
+            pd.to_datetime(["2020-01-01", "2020-01-03"]).tolist(),
+        )
+
+        # keys in the index, datetime given as str is compared after the cast
+        df["calendardate"] = df["calendardate"].astype(str)
+        d = self._get_df_written(df.set_index(["calendardate", "name"]), is_index=True)
+        self.assertEqual(d.index.get_level_values("name").tolist(), ["b", "a"])
+
+    def test_no_new_rows(self):
+        df = pd.DataFrame(
+            {
+                "calendardate": pd.to_datetime(["2020-01-02"]),
+                "name": ["a"],
+                "px_d": [5.0],
+            }
+        )
+        self.assertIsNone(self._get_df_written(df))
+
+
+class TestWriteDfToSqlInsert(unittest.TestCase):
+    def setUp(self):
+        self.df = pd.DataFrame(
+            {
+                "calendardate": pd.to_datetime(
+                    ["2020-01-01", None, "2020-01-03", "2020-01-06", "2020-01-07"]
+                ),
+                "px_d": [1.5, np.nan, 3.0, np.inf, 5.0],
+                "n_d": np.arange(5),
+                "name": ["a", None, "c", "d", "e"],
+                "other": 1.0,
+            }
+        )
+
+    def test_df_sql_write(self):
+        df_copy = self.df.copy()
+        df = helpers_sql._get_df_sql_write(
+            self.df,
+            "tab",
+            ["calendardate", "px_d", "n_d", "name"],
+            is_warn_drop_cols=False,
+        )
+        pd.testing.assert_frame_equal(self.df, df_copy)
+        self.assertEqual(list(df.columns), ["calendardate", "px_d", "n_d", "name"])
+        self.assertTrue(np.isnan(df["px_d"].iloc[3]))
+        # columns of the target dtype are not copied
+        self.assertTrue(
+            np.shares_memory(df["n_d"].to_numpy(), self.df["n_d"].to_numpy())
+        )
+
+    def _get_lst_sql(self, df: pd.DataFrame, n_rows: int, **kwargs) -> list:
+        # max_allowed_packet for n_rows rows per statement, see _write_df_to_sql_insert
+        lst_tup_col = [helpers_sql._get_tup_sql_col(df[c]) for c in df.columns]
+        row_bytes = len(repr(helpers_sql._get_lst_sql_params(lst_tup_col, 0, len(df))))
+        cursor = _FakeCursor([], [(int(2 * (n_rows + 0.5) * row_bytes / len(df)),)])
+        sql_eng = mock.MagicMock()
+        sql_eng.engine.raw_connection.return_value.cursor.return_value = cursor
+        helpers_sql._write_df_to_sql_insert(df, "tab", sql_eng, **kwargs)
+        sql_eng.engine.raw_connection.return_value.commit.assert_called_once()
+        return cursor.lst_sql[1:]
+
+    def test_insert_chunks(self):
+        df = self.df[["calendardate", "px_d", "n_d", "name"]]
+        lst_sql = self._get_lst_sql(df, 2)
+        self.assertEqual(
+            [sql for sql, _ in lst_sql],
+            [
+                "INSERT INTO `tab` (`calendardate`, `px_d`, `n_d`, `name`) VALUES "
+                + ", ".join(["(%s, %s, %s, %s)"] * n)
+                for n in [2, 2, 1]
+            ],
+        )
+        self.assertEqual(
+            lst_sql[0][1],
+            ["2020-01-01T00:00:00", 1.5, 0, "a", None, None, 1, None],
+        )
+        self.assertEqual(lst_sql[2][1], ["2020-01-07T00:00:00", 5.0, 4, "e"])
+        self.assertIsInstance(lst_sql[0][1][2], int)
+
+    def test_upsert(self):
+        lst_sql = self._get_lst_sql(self.df[["n_d", "px_d"]], 5, lst_keys=["n_d"])
+        self.assertEqual(len(lst_sql), 1)
+        self.assertTrue(
+            lst_sql[0][0].endswith(" ON DUPLICATE KEY UPDATE `px_d`=VALUES(`px_d`)")
+        )
+
+    def test_append_route(self):
+        df = self.df[["n_d", "px_d"]].set_index("n_d")
+        for str_dialect, is_insert in [("mysql", True), ("sqlite", False)]:
+            sql_eng = mock.MagicMock()
+            sql_eng.engine.dialect.name = str_dialect
+            with (
+                mock.patch.object(helpers_sql, "_write_df_to_sql_insert") as insert,
+                mock.patch.object(pd.DataFrame, "to_sql") as to_sql,
+            ):
+                helpers_sql._write_df_to_sql_method(
+                    df,
+                    "tab",
+                    sql_eng,
+                    if_exists="append",
+                    is_index=True,
+                    chunksize=500,
+                    method=None,
+                    bulk_strategy="load_data",
+                )
+            self.assertEqual(insert.called, is_insert)
+            self.assertEqual(to_sql.called, not is_insert)
+            if is_insert:
+                pd.testing.assert_frame_equal(
+                    insert.call_args.args[0], df.reset_index()
+                )
+
+
+class TestSqlSchemaCache(unittest.TestCase):
+    def test_replace_invalidates(self):
+        sql_eng = sqlalchemy.create_engine("sqlite://")
+        db_name = str(sql_eng.engine.url).split("/")[-1]
+        cache = helpers_sql.SqlSchemaCache()
+        with cache._lock:
+            cache._dct_cols[(db_name, "tab")] = (time.monotonic(), ("a", "b"))
+            cache._dct_keys[(db_name, "tab")] = (time.monotonic(), (("a",), True))
+            cache._dct_keys[(db_name, "other")] = (time.monotonic(), ((), False))
+
+        df = pd.DataFrame({"c": [1.0]})
+        with mock.patch.object(helpers_sql, "SQL_SCHEMA_CACHE", cache):
+            helpers_sql._write_df_to_sql_method(
+                df,
+                "tab",
+                sql_eng,
+                if_exists="replace",
+                is_index=False,
+                chunksize=10,
+                method=None,
+                bulk_strategy="load_data",
+            )
+        self.assertNotIn((db_name, "tab"), cache._dct_cols)
+        self.assertNotIn((db_name, "tab"), cache._dct_keys)
+        self.assertIn((db_name, "other"), cache._dct_keys)
+
+        cache.invalidate(db_name)
+        self.assertEqual(cache._dct_keys, {})
+
+
+_STR_SINK_EXIT = """
+import sys
+from unittest import mock
+import pandas as pd
+import lukas_utils.helpers_sql as helpers_sql
+
+def write_df_to_sql(df, tab_name, sql_eng, **kwargs):
+    with open(sys.argv[1], "a") as f:
+        f.write(f"{tab_name} {len(df)}\\n")
+
+helpers_sql.write_df_to_sql = write_df_to_sql
+helpers_sql.get_sql_engine = mock.Mock()
+sink = helpers_sql.SqlWriterSink("db", flush_rows=10**6, flush_interval=600)
+for i in range(3):
+    sink.submit(pd.DataFrame({"a": range(5)}), "tab")
+"""
+
+
+class TestSqlWriterSink(unittest.TestCase):
+    def test_flush_at_exit(self):
+        with tempfile.TemporaryDirectory() as path:
+            path_out = os.path.join(path, "out.txt")
+            subprocess.run(
+                [sys.executable, "-c", _STR_SINK_EXIT, path_out],
+                check=True,
+                timeout=60,
+                cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            )
+            with open(path_out) as f:
+                self.assertEqual(f.read(), "tab 15\n")
+
+    def test_write_failed(self):
+        # failed writes are spilled inside write_df_to_sql and only seen in its result
+        with (
+            mock.patch.object(
+                helpers_sql,
+                "get_sql_engine",
+                return_value=sqlalchemy.create_engine("sqlite://"),
+            ),
+            mock.patch.object(
+                helpers_sql.SQL_SCHEMA_CACHE, "get_columns", return_value=["a"]
+            ),
+            mock.patch.object(
+                helpers_sql,
+                "_write_df_to_sql_limited",
+                side_effect=lambda df, db_name, dct_write: dct_write["tab_name"]
+                == "tab",
+            ),
+        ):
+            with helpers_sql.SqlWriterSink(
+                "db", flush_rows=10**6, flush_interval=600
+            ) as sink:
+                sink.submit(pd.DataFrame({"a": range(5)}), "tab")
+                sink.submit(pd.DataFrame({"a": range(3)}), "tab_fail")
+        dct = sink.get_stats()
+        self.assertEqual((dct["n_flushes"], dct["n_rows"], dct["n_errors"]), (2, 5, 1))
+
+
+class TestSqlWriteSemaphore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.policy = helpers_sql.SqlRetryPolicy(dead_letter_dir=self.tmp.name)
+        self.tup_limits = helpers_sql.SQL_MAX_WRITERS, helpers_sql.SQL_WRITE_TIMEOUT
+        helpers_sql.set_sql_max_writers(1, timeout=0.05)
+
+    def tearDown(self):
+        helpers_sql.set_sql_max_writers(*self.tup_limits)
+        self.tmp.cleanup()
+
+    def test_timeout_spills(self):
+        df = pd.DataFrame({"a": [1, 2]})
+        semaphore = helpers_sql._get_sql_write_semaphore()
+        with (
+            mock.patch.object(helpers_sql, "SQL_RETRY_POLICY", self.policy),
+            mock.patch.object(
+                helpers_sql, "_write_df_to_sql_retry", return_value=True
+            ) as write,
+        ):
+            semaphore.acquire()
+            self.assertFalse(
+                helpers_sql._write_df_to_sql_limited(df, "db", {"tab_name": "tab"})
+            )
+            write.assert_not_called()
+            self.assertEqual(len(os.listdir(os.path.join(self.tmp.name, "db"))), 1)
+
+            semaphore.release()
+            self.assertTrue(
+                helpers_sql._write_df_to_sql_limited(df, "db", {"tab_name": "tab"})
+            )
+            write.assert_called_once()
+
+        # slot is released after the write
+        self.assertTrue(semaphore.acquire(timeout=0))
+        semaphore.release()
+
+
+class TestSqlTsv(unittest.TestCase):
+    def test_escaping(self):
+        ser = pd.Series(["a\tb", "c\nd", "e\\f", None, "\\N"], dtype=object)
+        self.assertEqual(
+            helpers_sql._get_ser_tsv(ser).tolist(),
+            ["a\\tb", "c\\nd", "e\\\\f", "\\N", "\\\\N"],
+        )
+
+    def test_na(self):
+        for ser in [
+            pd.Series([1.5, np.nan]),
+            pd.Series([1, None], dtype="Int64"),
+            pd.Series(["a", None], dtype="string"),
+            pd.Series(pd.to_datetime(["2020-01-01 10:00:01", None])),
+        ]:
+            self.assertEqual(helpers_sql._get_ser_tsv(ser).iloc[1], "\\N")
+        self.assertEqual(
+            helpers_sql._get_ser_tsv(
+                pd.Series(pd.to_datetime(["2020-01-01 10:00:01"]))
+            ).iloc[0],
+            "2020-01-01 10:00:01",
+        )
+
+    def test_bool(self):
+        for ser in [
+            pd.Series([True, False, False]),
+            pd.Series([True, False, None], dtype="boolean"),
+            pd.Series([True, False, None], dtype=object),
+        ]:
+            lst = helpers_sql._get_ser_tsv(ser).tolist()
+            self.assertEqual(lst[:2], ["1", "0"], ser.dtype)
+            self.assertIn(lst[2], ["0", "\\N"])
+        self.assertEqual(
+            helpers_sql._get_ser_tsv(pd.Series([True, None], dtype="boolean")).tolist(),
+            ["1", "\\N"],
+        )
+
+
+class TestReadSqlStream(unittest.TestCase):
+    def setUp(self):
+        self.cursor = _FakeCursor(
+            ["calendardate", "name", "px_d"],
+            [
+                (f"2020-01-0{i + 1} 00:00:00", "a" if i % 2 else None, i)
+                for i in range(5)
+            ],
+        )
+        self.sql_eng = mock.MagicMock()
+        self.sql_con = self.sql_eng.raw_connection.return_value
+        self.sql_con.cursor.return_value = self.cursor
+        patcher = mock.patch.object(
+            helpers_sql.SQL_SCHEMA_CACHE,
+            "get_key_columns",
+            return_value=["calendardate", "name"],
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _get_iter(self, **kwargs):
+        return helpers_sql.read_sql_stream(
+            "tab", "db", chunksize=2, sql_eng=self.sql_eng, **kwargs
+        )
+
+    def test_chunks(self):
+        lst_df = list(self._get_iter())
+        self.assertEqual([len(df) for df in lst_df], [2, 2, 1])
+        self.assertEqual(self.cursor.lst_fetch, [2, 2, 2, 2])
+        self.assertEqual(self.cursor.lst_sql, [("SELECT * FROM `tab`", None)])
+        self.sql_con.cursor.assert_called_once_with(buffered=False)
+
+        df = pd.concat(lst_df)
+        self.assertEqual(df.index.names, ["calendardate", "name"])
+        self.assertEqual(
+            df.index.get_level_values("calendardate").dtype, "datetime64[ns]"
+        )
+        self.assertEqual(df["px_d"].dtype, np.float64)
+        self.assertEqual(df["px_d"].tolist(), [0.0, 1.0, 2.0, 3.0, 4.0])
+
+        self.assertTrue(self.cursor.is_closed)
+        self.sql_con.invalidate.assert_not_called()
+        self.sql_con.close.assert_called_once()
+
+    def test_query_without_index(self):
+        lst_df = list(self._get_iter(query="SELECT `px_d` FROM `tab`", is_index=False))
+        self.assertEqual(self.cursor.lst_sql, [("SELECT `px_d` FROM `tab`", None)])
+        self.assertEqual(list(lst_df[0].columns), ["calendardate", "name", "px_d"])
+        self.assertIsInstance(lst_df[0].index, pd.RangeIndex)
+
+    def test_close_early(self):
+        iter_df = self._get_iter()
+        next(iter_df)
+        iter_df.close()
+        # unread rows on the unbuffered cursor, the connection is discarded
+        self.sql_con.invalidate.assert_called_once()
+        self.sql_con.close.assert_called_once()
+
+
+class TestReadSqlParallel(unittest.TestCase):
+    def test_bounds_inside_range(self):
+        for val_min, val_max in [
+            (2**60 + 1, 2**60 + 1001),
+            (pd.Timestamp("2020-01-01 10:00:40.123457"), pd.Timestamp("2020-01-02")),
+            (np.datetime64("2020-01-01T00:00:00.000001"), np.datetime64("2020-01-01")),
+        ]:
+            lst = helpers_sql._get_lst_sql_bounds(val_min, val_max, 4)
+            self.assertLessEqual(len(lst), 3)
+
+        self.assertEqual(
+            helpers_sql._get_lst_sql_bounds(2**60 + 1, 2**60 + 1001, 4),
+            [str(2**60 + 1 + 250 * k) for k in range(1, 4)],
+        )
+        self.assertEqual(helpers_sql._get_lst_sql_bounds(3, 4, 4), ["3"])
+        with self.assertRaises(TypeError):
+            helpers_sql._get_lst_sql_bounds("a", "b", 4)
+
+    def test_min_max_rows_read(self):
+        sql_eng = sqlalchemy.create_engine(
+            "sqlite://",
+            connect_args={"check_same_thread": False},
+            poolclass=sqlalchemy.pool.StaticPool,
+        )
+        df = pd.DataFrame({"id": [2**60 + i for i in [255, 300, 400, 700, 769]]})
+        df["v"] = np.arange(len(df), dtype=float)
+        df.to_sql("tab", sql_eng, index=False)
+
+        def read_sql_stream(query: str, **kwargs):
+            yield pd.read_sql(query, sql_eng)
+
+        with (
+            mock.patch.object(helpers_sql, "get_sql_engine", return_value=sql_eng),
+            mock.patch.object(helpers_sql, "read_sql_stream", read_sql_stream),
+        ):
+            for n_parts in [1, 3, 8]:
+                d = helpers_sql.read_sql_parallel(
+                    "tab", "db", n_parts=n_parts, split_col="id", is_index=False
+                )
+                pd.testing.assert_frame_equal(
+                    d.reset_index(drop=True).astype(df.dtypes.to_dict()), df
+                )
+
+
+class TestSqlQueryCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = helpers_sql.SqlQueryCache(self.tmp.name)
+        self.tab_state = ("MyISAM", ("2020-01-01 00:00:00", "3"), False)
+        self.n_reads = 0
+        self.on_read = None
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _read_sql_stream(self, tab_name: str, db_name: str, **kwargs):
+        self.n_reads += 1
+        if self.on_read is not None:
+            self.on_read()
+        yield pd.DataFrame({"a": [1, 2, 3]})
+
+    def _read(self, **kwargs) -> pd.DataFrame:
+        with (
+            mock.patch.object(helpers_sql, "SQL_QUERY_CACHE", self.cache),
+            mock.patch.object(helpers_sql, "get_sql_engine"),
+            mock.patch.object(
+                helpers_sql, "_get_sql_tab_state", return_value=self.tab_state
+            ),
+            mock.patch.object(helpers_sql, "read_sql_stream", self._read_sql_stream),
+        ):
+            return helpers_sql.read_sql_cached("tab", "db", is_index=False, **kwargs)
+
+    def test_hit_and_invalidate(self):
+        df = self._read()
+        pd.testing.assert_frame_equal(self._read(), df)
+        self.assertEqual(self.n_reads, 1)
+
+        self.cache.invalidate("db", "tab")
+        self._read()
+        self.assertEqual(self.n_reads, 2)
+
+    def test_hit_dtypes(self):
+        # hits are NumPy backed like misses, not Arrow backed
+        df = pd.DataFrame(
+            {
+                "n": np.arange(3),
+                "px": [1.0, np.nan, 3.0],
+                "name": ["a", None, "c"],
+                "calendardate": pd.to_datetime(["2020-01-01", "2020-01-02", None]),
+            },
+            index=pd.Index([5, 6, 7], name="id"),
+        )
+        self.assertTrue(self.cache.put("db", "tab", "key", df))
+        pd.testing.assert_frame_equal(self.cache.get("db", "tab", "key"), df)
+
+    def test_invalidate_during_read(self):
+        # a write finishing while the query runs must not leave its result cached
+        self.on_read = lambda: self.cache.invalidate("db", "tab")
+        self._read()
+        self.on_read = None
+        self.assertEqual(self.cache.get_stats()["n_files"], 0)
+        self._read()
+        self._read()
+        self.assertEqual(self.n_reads, 2)
+
+    def test_put_stale_version(self):
+        version = self.cache.get_version("db", "tab")
+        self.cache.invalidate("db", "tab")
+        self.assertFalse(
+            self.cache.put("db", "tab", "key", pd.DataFrame({"a": [1]}), version)
+        )
+        self.assertNotEqual(self.cache.get_version("db", "tab"), version)
+        self.assertEqual(self.cache.get_stats()["n_files"], 0)
+
+    def test_innodb_uncached(self):
+        self.tab_state = ("InnoDB", ("None", "3"), False)
+        self._read()
+        self._read()
+        self.assertEqual(self.n_reads, 2)
+
+        self._read(is_local_writes_only=True)
+        self._read(is_local_writes_only=True)
+        self.assertEqual(self.n_reads, 3)
+
+    def test_recent_update_uncached(self):
+        self.tab_state = ("MyISAM", ("2020-01-01 00:00:00", "3"), True)
+        self._read()
+        self._read()
+        self.assertEqual(self.n_reads, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+import gc
+import os
+import pickle
+import tempfile
+import time
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from lukas_utils.utils import SharedDataFrame, run_parallel_iter
+
+
+def _touch(dct: dict) -> int:
+    # marks the task as started
+    open(os.path.join(dct["path"], str(dct["i"])), "w").close()
+    return dct["i"]
+
+
+class TestRunParallelIter(unittest.TestCase):
+    def test_max_in_flight(self):
+        for engine in ["multithreading", "multiprocess_imap", "joblib"]:
+            with tempfile.TemporaryDirectory() as path:
+                lst_args = [{"path": path, "i": i} for i in range(40)]
+                lst_res = []
+                for res in run_parallel_iter(
+                    _touch,
+                    lst_args,
+                    n_process=2,
+                    parallel_engine=engine,
+                    is_ordered=True,
+                    max_in_flight=4,
+                ):
+                    lst_res.append(res)
+                    time.sleep(0.01)
+                    self.assertLessEqual(len(os.listdir(path)), len(lst_res) + 4)
+                self.assertEqual(lst_res, list(range(40)), engine)
+
+    def test_close_early(self):
+        with tempfile.TemporaryDirectory() as path:
+            iter_res = run_parallel_iter(
+                _touch,
+                [{"path": path, "i": i} for i in range(40)],
+                n_process=2,
+                parallel_engine="joblib",
+                max_in_flight=4,
+            )
+            self.assertIn(next(iter_res), range(40))
+            iter_res.close()
+            # pending tasks are cancelled
+            time.sleep(0.5)
+            self.assertLessEqual(len(os.listdir(path)), 5)
+
+
+class TestSharedDataFrame(unittest.TestCase):
+    def setUp(self):
+        self.df = pd.DataFrame(
+            {
+                "a": np.arange(1000, dtype="float64"),
+                "b": np.arange(1000, dtype="int32"),
+                "c": ["x"] * 1000,
+                "d": pd.date_range("2020-01-01", periods=1000, freq="min"),
+            },
+            index=pd.RangeIndex(1000).astype("int64"),
+        )
+
+    def test_get_df(self):
+        with SharedDataFrame(self.df) as sdf:
+            df = sdf.get_df()
+            pd.testing.assert_frame_equal(df, self.df)
+            self.assertFalse(df["a"].to_numpy().flags.writeable)
+
+    def test_column_after_unlink(self):
+        with SharedDataFrame(self.df) as sdf:
+            ser = sdf.get_df()["a"]
+            arr_index = sdf.get_df().index.to_numpy()
+        sdf.close()
+        gc.collect()
+        self.assertEqual(ser.sum(), self.df["a"].sum())
+        np.testing.assert_array_equal(arr_index, self.df.index.to_numpy())
+
+    def test_unpickled_handle_collected(self):
+        with SharedDataFrame(self.df) as sdf:
+            sdf_copy = pickle.loads(pickle.dumps(sdf))
+            ser = sdf_copy.get_df()["d"]
+            del sdf_copy
+            gc.collect()
+            self.assertTrue(ser.equals(self.df["d"]))
+        gc.collect()
+        self.assertTrue(ser.equals(self.df["d"]))
+
+
+if __name__ == "__main__":
+    unittest.main()